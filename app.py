@@ -1,12 +1,32 @@
 # --- Importações de Ferramentas ---
+import csv
+import hashlib
+import io
+import json
+import mimetypes
 import os
+import time
+from collections import Counter
 from datetime import datetime, date
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
+from urllib.parse import quote
 from flask import (Flask, render_template, request, redirect, url_for,
-                   session, send_from_directory, flash)
+                   session, send_from_directory, flash, abort, jsonify,
+                   make_response, Request, Response, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.security import safe_join
+
+import hashing
+import jobs
+import metrics
+import static_assets
+import storage
 
 # --- Configuração Geral do Aplicativo ---
 app = Flask(__name__)
@@ -20,10 +40,67 @@ DB_NAME = "gsme"
 
 # --- Configuração do SQLAlchemy ---
 app.config['SECRET_KEY'] = 'gK4bV7cZ2xN1mS6jH8fD3aT'
-# A string de conexão é montada com os dados acima
-app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# A string de conexão é montada com os dados acima, a menos que a variável de
+# ambiente SQLALCHEMY_DATABASE_URI aponte para outro banco (ex.: um MySQL
+# local ou 'sqlite:///gsme.db' para desenvolvimento e benchmarks)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'SQLALCHEMY_DATABASE_URI',
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
+# Tamanho máximo de um arquivo enviado (50 MiB). O Werkzeug recusa antes
+# corpos maiores que isso (com folga para os campos do formulário).
+app.config['UPLOAD_MAX_BYTES'] = 50 * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = app.config['UPLOAD_MAX_BYTES'] + 64 * 1024
+# Entrega dos downloads pelo proxy: com nginx, informe o prefixo da location
+# 'internal' que aponta para a pasta de uploads (ex.: '/protected-uploads/').
+# Com Apache/lighttpd, use a opção nativa do Flask USE_X_SENDFILE = True.
+# Em ambos os casos o app só confere o login; o proxy transfere o arquivo.
+app.config['UPLOAD_ACCEL_REDIRECT'] = None
+# Tempo de cache (em segundos) dos arquivos endereçados pelo conteúdo
+app.config['UPLOAD_CACHE_MAX_AGE'] = 365 * 24 * 60 * 60
+# Tamanho padrão e máximo das páginas dos painéis (paginação por cursor)
+app.config['ITENS_POR_PAGINA'] = 50
+app.config['ITENS_POR_PAGINA_MAX'] = 200
+# Quando ativo, o resumo por usuário do painel é lido da tabela
+# 'resumo_solicitacao', mantida a cada alteração. Antes de ativar, preencha
+# a tabela com: flask --app app reconstruir-resumo
+app.config['RESUMO_INCREMENTAL'] = False
+# Exportação: linhas buscadas do banco por vez (cursor do lado do servidor)
+app.config['EXPORTACAO_YIELD_PER'] = 1000
+# Importação em lote: linhas por INSERT
+app.config['IMPORTACAO_TAMANHO_LOTE'] = 500
+# Instrumentação (ver metrics.py): consultas por requisição acima das quais
+# um possível N+1 é registrado no log, e token aceito por /metrics para o
+# coletor do Prometheus (sem token, só administradores logados acessam)
+app.config['METRICAS_LIMITE_CONSULTAS'] = 20
+app.config['METRICAS_TOKEN'] = None
+# Fila de tarefas em segundo plano (ver jobs.py) e coleta de arquivos órfãos:
+# intervalo entre varreduras, arquivos por consulta e idade mínima (segundos)
+# para um arquivo sem solicitacao ser apagado, protegendo envios em andamento
+app.config['TAREFAS_ATIVAS'] = True
+app.config['TAREFAS_WORKERS'] = 2
+app.config['GC_INTERVALO'] = 60 * 60
+app.config['GC_LOTE'] = 500
+app.config['GC_CARENCIA'] = 60 * 60
+# Miniaturas dos anexos (exigem Pillow; PDFs também exigem pdf2image)
+app.config['MINIATURAS_ATIVAS'] = True
+app.config['MINIATURA_TAMANHO'] = (240, 240)
+# Hash de senhas (ver hashing.py): método do werkzeug, processos do pool,
+# hashes que podem aguardar na fila antes de responder 503 e espera máxima.
+# Hashes armazenados com outro método são refeitos no próximo login.
+app.config['HASH_METODO'] = 'scrypt:32768:8:1'
+app.config['HASH_WORKERS'] = 2
+app.config['HASH_FILA'] = 16
+app.config['HASH_TIMEOUT'] = 10
+# Arquivos estáticos (ver static_assets.py): url_for('static') gera nomes com
+# o hash do conteúdo, servidos com cache de um ano e versões .gz/.br geradas
+# em build/static. Templates compilados ficam em build/jinja (None desativa).
+app.config['STATIC_FINGERPRINT'] = True
+app.config['STATIC_BUILD_FOLDER'] = os.path.join(app.root_path, 'build', 'static')
+app.config['STATIC_CACHE_MAX_AGE'] = 365 * 24 * 60 * 60
+app.config['JINJA_CACHE_FOLDER'] = os.path.join(app.root_path, 'build', 'jinja')
 
 ADMIN_ACCESS_KEY = "SMEitace06"
 
@@ -33,8 +110,53 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Inicializa a extensão SQLAlchemy
 db = SQLAlchemy(app)
 
+# Pool de processos para hashes de senha, criado no primeiro uso
+servico_hash = hashing.ServicoHash(app.config)
+
+# Tempos de banco/renderização por requisição (Server-Timing e /metrics)
+instrumentacao = metrics.Instrumentacao(app, db)
+
+# Nomes versionados e pré-compressão dos arquivos de static/
+arquivos_estaticos = static_assets.ArquivosEstaticos(app)
+
+class RequisicaoGsme(Request):
+    """Grava os anexos de upload_arquivo direto em uploads/.tmp.
+
+    O SHA-256 é calculado e o limite UPLOAD_MAX_BYTES conferido enquanto o
+    Werkzeug lê o corpo, sem a cópia temporária que ele faria antes da view.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == 'upload_arquivo':
+            return storage.BlobEmGravacao(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_MAX_BYTES'])
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+app.request_class = RequisicaoGsme
+
 
 # --- Modelos de Banco de Dados (Tabelas) ---
+class AgoraNoBanco(FunctionElement):
+    """Momento atual pelo relógio do banco, com frações de segundo.
+
+    Usado em Solicitacao.atualizado_em (base do ETag dos painéis): um único
+    relógio para todos os servidores do app, que não volta no tempo quando
+    o horário de um deles é ajustado (NTP, horário de verão).
+    """
+    type = db.DateTime()
+    inherit_cache = True
+
+@compiles(AgoraNoBanco)
+def _agora_no_banco(elemento, compilador, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+@compiles(AgoraNoBanco, 'mysql')
+def _agora_no_banco_mysql(elemento, compilador, **kw):
+    return 'CURRENT_TIMESTAMP(6)'
+
+@compiles(AgoraNoBanco, 'sqlite')
+def _agora_no_banco_sqlite(elemento, compilador, **kw):
+    # CURRENT_TIMESTAMP do SQLite só tem segundos
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
     id = db.Column(db.Integer, primary_key=True)
@@ -54,6 +176,21 @@ class Solicitacao(db.Model):
     assigned_to_username = db.Column(db.String(80), nullable=False)
     arquivo_path = db.Column(db.String(300), nullable=True)
     data_entrega = db.Column(db.Date, nullable=True)
+    # Momento da última alteração (com microssegundos no MySQL), usado no ETag
+    # dos painéis. Vem sempre do relógio do banco, nunca do servidor do app.
+    atualizado_em = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'),
+                              nullable=False, default=AgoraNoBanco(), onupdate=AgoraNoBanco())
+
+    # Índices compostos usados pela paginação por cursor (prazo, id),
+    # com e sem o filtro por usuário atribuído, e pela versão dos painéis.
+    # O de arquivo_path atende a coleta de órfãos e a troca de miniaturas.
+    __table_args__ = (
+        db.Index('ix_solicitacao_prazo_id', 'prazo', 'id'),
+        db.Index('ix_solicitacao_assignee_prazo_id', 'assigned_to_username', 'prazo', 'id'),
+        db.Index('ix_solicitacao_atualizado_em', 'atualizado_em'),
+        db.Index('ix_solicitacao_assignee_atualizado_em', 'assigned_to_username', 'atualizado_em'),
+        db.Index('ix_solicitacao_arquivo_path', 'arquivo_path'),
+    )
 
     # Adiciona uma propriedade para facilitar o acesso ao objeto usuário
     assignee = db.relationship('Usuario', foreign_keys=[assigned_to_username], primaryjoin="Solicitacao.assigned_to_username == Usuario.username", backref='solicitacao')
@@ -61,6 +198,56 @@ class Solicitacao(db.Model):
     def __repr__(self):
         return f'<Solicitacao {self.id}>'
 
+class Arquivo(db.Model):
+    """Blob armazenado em disco pelo SHA-256 e quantas solicitacoes o usam."""
+    __tablename__ = 'arquivos'
+    caminho = db.Column(db.String(300), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False)
+    tamanho = db.Column(db.BigInteger, nullable=False)
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Arquivo {self.caminho} ({self.referencias})>'
+
+class ResumoSolicitacao(db.Model):
+    """Contagem de solicitacoes por usuário e prazo, mantida incrementalmente.
+
+    O prazo faz parte da chave porque uma solicitacao pendente passa a estar
+    atrasada com a simples virada do dia, sem nenhuma alteração no banco.
+    """
+    __tablename__ = 'resumo_solicitacao'
+    assigned_to_username = db.Column(db.String(80), primary_key=True)
+    prazo = db.Column(db.Date, primary_key=True)
+    pendentes = db.Column(db.Integer, nullable=False, default=0)
+    entregues_a_tempo = db.Column(db.Integer, nullable=False, default=0)
+    entregues_com_atraso = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResumoSolicitacao {self.assigned_to_username} {self.prazo}>'
+
+class Tarefa(db.Model):
+    """Tarefa em segundo plano, gravada junto com a mudança que a originou."""
+    __tablename__ = 'tarefas'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    argumentos = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.Text, nullable=True)
+    executar_apos = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_tarefas_status_executar_apos', 'status', 'executar_apos'),
+    )
+
+    def __repr__(self):
+        return f'<Tarefa {self.id} {self.tipo} ({self.status})>'
+
+# Fila de tarefas: as threads começam na primeira requisição
+fila_tarefas = jobs.FilaTarefas(app, db, Tarefa)
+
 # --- Decoradores (Filtros de Acesso para as Páginas) ---
 def login_required(f):
     @wraps(f)
@@ -96,33 +283,595 @@ def get_subordinates():
     subordinates = db.session.execute(db.select(Usuario).filter_by(role='subordinado')).scalars().all()
     return [s.username for s in subordinates]
 
-def processar_solicitacao(solicitacao_obj):
-    """Adiciona informações úteis (cor de status e link de download) a uma solicitacao de serviço."""
-    solicitacao_dict = {
-        'id': solicitacao_obj.id,
-        'descricao': solicitacao_obj.descricao,
-        'prazo': solicitacao_obj.prazo.strftime('%Y-%m-%d'),
-        'status': solicitacao_obj.status,
-        'assigned_to_username': solicitacao_obj.assigned_to_username,
-        'arquivo_path': solicitacao_obj.arquivo_path,
-        'data_entrega': solicitacao_obj.data_entrega.strftime('%Y-%m-%d') if solicitacao_obj.data_entrega else None,
-        'status_class': '',
-        'download_link': None
-    }
-    
-    solicitacao_prazo = solicitacao_obj.prazo
-    
-    if solicitacao_obj.status == 'Entregue':
+def classificar_status(status, prazo, data_entrega, hoje=None):
+    """Retorna a classe CSS do status: 'entregue-a-tempo', 'atrasado' ou ''."""
+    if status == 'Entregue':
+        if data_entrega and prazo:
+            return 'entregue-a-tempo' if data_entrega <= prazo else 'atrasado'
+        return ''
+    if prazo < (hoje or date.today()):
+        return 'atrasado'
+    return ''
+
+def categoria_resumo(solicitacao_obj):
+    """Retorna a coluna de ResumoSolicitacao em que a solicitacao é contada."""
+    if solicitacao_obj.status != 'Entregue':
+        return 'pendentes'
+    if solicitacao_obj.data_entrega is None:
+        return None
+    if solicitacao_obj.data_entrega <= solicitacao_obj.prazo:
+        return 'entregues_a_tempo'
+    return 'entregues_com_atraso'
+
+def somar_ou_inserir(modelo, chaves, valores, incrementos):
+    """Insere a linha ou, se a chave já existir, soma 'incrementos' às colunas.
+
+    Um único upsert atômico: duas requisições simultâneas para uma chave
+    ainda sem linha não disputam o mesmo INSERT (o que daria IntegrityError).
+    """
+    atualizar = {coluna: getattr(modelo, coluna) + delta for coluna, delta in incrementos.items()}
+    if db.session.get_bind().dialect.name == 'mysql':
+        stmt = mysql.insert(modelo).values(valores).on_duplicate_key_update(atualizar)
+    else:
+        # SQLite (desenvolvimento, benchmarks e testes)
+        stmt = sqlite.insert(modelo).values(valores).on_conflict_do_update(index_elements=chaves, set_=atualizar)
+    db.session.execute(stmt)
+
+def ajustar_resumo(username, prazo, categoria, delta):
+    """Soma 'delta' a uma contagem do resumo incremental (na transação atual)."""
+    if not app.config['RESUMO_INCREMENTAL'] or categoria is None:
+        return
+    somar_ou_inserir(
+        ResumoSolicitacao, ['assigned_to_username', 'prazo'],
+        {'assigned_to_username': username, 'prazo': prazo,
+         'pendentes': 0, 'entregues_a_tempo': 0, 'entregues_com_atraso': 0, categoria: delta},
+        {categoria: delta},
+    )
+
+def resumo_por_subordinado():
+    """Conta pendentes, atrasadas e entregues (a tempo ou não) por usuário.
+
+    Tudo é calculado no banco com um único GROUP BY: sobre 'solicitacao',
+    ou sobre 'resumo_solicitacao' quando RESUMO_INCREMENTAL está ativo.
+    """
+    hoje = date.today()
+    if app.config['RESUMO_INCREMENTAL']:
+        r = ResumoSolicitacao
+        usuario = r.assigned_to_username
+        stmt = db.select(
+            usuario,
+            func.coalesce(func.sum(case((r.prazo >= hoje, r.pendentes), else_=0)), 0).label('pendentes'),
+            func.coalesce(func.sum(case((r.prazo < hoje, r.pendentes), else_=0)), 0).label('atrasadas'),
+            func.coalesce(func.sum(r.entregues_a_tempo), 0).label('entregues_a_tempo'),
+            func.coalesce(func.sum(r.entregues_com_atraso), 0).label('entregues_com_atraso'),
+        )
+    else:
+        s = Solicitacao
+        pendente = s.status != 'Entregue'
+        entregue = s.status == 'Entregue'
+        usuario = s.assigned_to_username
+        stmt = db.select(
+            usuario,
+            func.count(case((and_(pendente, s.prazo >= hoje), 1))).label('pendentes'),
+            func.count(case((and_(pendente, s.prazo < hoje), 1))).label('atrasadas'),
+            func.count(case((and_(entregue, s.data_entrega <= s.prazo), 1))).label('entregues_a_tempo'),
+            func.count(case((and_(entregue, s.data_entrega > s.prazo), 1))).label('entregues_com_atraso'),
+        )
+    stmt = stmt.group_by(usuario).order_by(usuario)
+    return [linha._asdict() for linha in db.session.execute(stmt)]
+
+def reconstruir_resumo():
+    """Recalcula toda a tabela 'resumo_solicitacao' a partir de 'solicitacao'."""
+    s = Solicitacao
+    pendente = s.status != 'Entregue'
+    entregue = s.status == 'Entregue'
+    origem = db.select(
+        s.assigned_to_username,
+        s.prazo,
+        func.count(case((pendente, 1))),
+        func.count(case((and_(entregue, s.data_entrega <= s.prazo), 1))),
+        func.count(case((and_(entregue, s.data_entrega > s.prazo), 1))),
+    ).group_by(s.assigned_to_username, s.prazo)
+    db.session.execute(db.delete(ResumoSolicitacao))
+    db.session.execute(db.insert(ResumoSolicitacao).from_select(
+        ['assigned_to_username', 'prazo', 'pendentes', 'entregues_a_tempo', 'entregues_com_atraso'],
+        origem,
+    ))
+    db.session.commit()
+
+# Colunas lidas pela exportação e pela API (sem carregar objetos do ORM)
+COLUNAS_SOLICITACAO = (
+    Solicitacao.id, Solicitacao.descricao, Solicitacao.prazo, Solicitacao.status,
+    Solicitacao.assigned_to_username, Solicitacao.arquivo_path, Solicitacao.data_entrega,
+)
+
+# Campos de cada solicitacao no CSV, no NDJSON e na API (o caminho no disco não sai daqui)
+CAMPOS_SOLICITACAO = ['id', 'descricao', 'prazo', 'status', 'assigned_to_username',
+                      'data_entrega', 'status_class', 'download_link']
+
+def processar_solicitacoes(solicitacoes):
+    """Gera os dicionários de exibição (cor de status e link de download) de várias solicitacoes.
+
+    Aceita objetos do ORM ou linhas com as COLUNAS_SOLICITACAO e gera só os
+    CAMPOS_SOLICITACAO. A data de hoje e o prefixo do link de download são
+    calculados uma única vez, em vez de um url_for por linha.
+    """
+    hoje = date.today()
+    prefixo_download = url_for('uploaded_file', filename='-')[:-1]
+    for solicitacao_obj in solicitacoes:
+        arquivo_path = solicitacao_obj.arquivo_path
         data_entrega = solicitacao_obj.data_entrega
-        if data_entrega and solicitacao_prazo:
-            solicitacao_dict['status_class'] = 'entregue-a-tempo' if data_entrega <= solicitacao_prazo else 'atrasado'
-    elif solicitacao_prazo < date.today():
-        solicitacao_dict['status_class'] = 'atrasado'
-    
-    if solicitacao_obj.arquivo_path:
-        solicitacao_dict['download_link'] = url_for('uploaded_file', filename=os.path.basename(solicitacao_obj.arquivo_path))
-        
-    return solicitacao_dict
+        yield {
+            'id': solicitacao_obj.id,
+            'descricao': solicitacao_obj.descricao,
+            'prazo': solicitacao_obj.prazo.strftime('%Y-%m-%d'),
+            'status': solicitacao_obj.status,
+            'assigned_to_username': solicitacao_obj.assigned_to_username,
+            'data_entrega': data_entrega.strftime('%Y-%m-%d') if data_entrega else None,
+            'status_class': classificar_status(solicitacao_obj.status, solicitacao_obj.prazo, data_entrega, hoje),
+            'download_link': prefixo_download + quote(os.path.basename(arquivo_path)) if arquivo_path else None,
+        }
+
+def adicionar_miniaturas(solicitacoes, solicitacoes_processadas):
+    """Inclui o link da miniatura nas solicitacoes cujo anexo já tem uma gerada.
+
+    Como no link de download, o prefixo da URL é calculado uma vez e cada
+    linha custa um único stat no disco.
+    """
+    prefixo_miniatura = url_for('miniatura', filename='-')[:-1]
+    for solicitacao_obj, solicitacao_dict in zip(solicitacoes, solicitacoes_processadas):
+        arquivo_path = solicitacao_obj.arquivo_path
+        solicitacao_dict['miniatura_link'] = None
+        if arquivo_path:
+            miniatura = caminho_miniatura(arquivo_path)
+            if os.path.exists(miniatura):
+                solicitacao_dict['miniatura_link'] = prefixo_miniatura + quote(os.path.basename(miniatura))
+    return solicitacoes_processadas
+
+def registrar_referencia(sha256, caminho, tamanho):
+    """Conta mais uma referência ao blob (na transação atual)."""
+    somar_ou_inserir(
+        Arquivo, ['caminho'],
+        {'caminho': caminho, 'sha256': sha256, 'tamanho': tamanho, 'referencias': 1},
+        {'referencias': 1},
+    )
+
+def liberar_referencia(caminho):
+    """Desconta uma referência ao blob (na transação atual).
+
+    Retorna True se o blob ficou sem referências e deve ser apagado do disco
+    depois do commit. Arquivos antigos, sem registro na tabela 'arquivos',
+    pertencem a uma única solicitacao e também retornam True. A contagem é
+    feita no banco, que trava a linha até o commit.
+    """
+    descontados = db.session.execute(
+        db.update(Arquivo).where(Arquivo.caminho == caminho).values(referencias=Arquivo.referencias - 1)
+    ).rowcount
+    if descontados == 0:
+        return True
+    return db.session.execute(
+        db.delete(Arquivo).where(Arquivo.caminho == caminho, Arquivo.referencias <= 0)
+    ).rowcount > 0
+
+def versao_solicitacoes(username=None):
+    """Retorna (última alteração, quantidade) das solicitacoes, opcionalmente de um usuário."""
+    stmt = db.select(func.max(Solicitacao.atualizado_em), func.count(Solicitacao.id))
+    if username:
+        stmt = stmt.where(Solicitacao.assigned_to_username == username)
+    return tuple(db.session.execute(stmt).one())
+
+def versao_subordinados():
+    """Retorna (maior id, quantidade) dos subordinados, listados no painel do admin."""
+    return tuple(db.session.execute(
+        db.select(func.max(Usuario.id), func.count(Usuario.id)).filter_by(role='subordinado')
+    ).one())
+
+def etag_painel(*versoes):
+    """Calcula o ETag fraco de um painel a partir das versões dos dados exibidos.
+
+    Entram também o usuário, os parâmetros da URL e a data de hoje, já que a
+    classe de status ('atrasado') muda com a virada do dia. Retorna None se
+    houver mensagens flash pendentes, pois elas só aparecem numa renderização.
+    """
+    if session.get('_flashes'):
+        return None
+    partes = [request.endpoint, session.get('username'), session.get('role'),
+              request.query_string.decode(), date.today().isoformat()]
+    partes.extend(str(versao) for versao in versoes)
+    return hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+def resposta_nao_modificada(etag):
+    """Retorna uma resposta 304 se o navegador já tem essa versão do painel, senão None."""
+    if etag and request.if_none_match.contains_weak(etag):
+        return resposta_painel(etag, app.response_class(status=304))
+    return None
+
+def resposta_painel(etag, html):
+    """Monta a resposta de um painel com o ETag e os cabeçalhos de cache."""
+    response = make_response(html)
+    if etag:
+        response.set_etag(etag, weak=True)
+    # Sempre revalida, e só no navegador do próprio usuário
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+def ler_cursor(valor):
+    """Converte um cursor no formato 'AAAA-MM-DD_id' em uma tupla (prazo, id)."""
+    if not valor:
+        return None
+    try:
+        prazo_str, id_str = valor.split('_', 1)
+        return datetime.strptime(prazo_str, '%Y-%m-%d').date(), int(id_str)
+    except ValueError:
+        return None
+
+def montar_cursor(solicitacao_obj):
+    """Gera o cursor ('AAAA-MM-DD_id') que aponta para uma solicitacao."""
+    return f"{solicitacao_obj.prazo.strftime('%Y-%m-%d')}_{solicitacao_obj.id}"
+
+def ler_itens_por_pagina():
+    """Lê o parâmetro 'por_pagina' da URL, limitado ao máximo configurado."""
+    por_pagina = request.args.get('por_pagina', type=int) or app.config['ITENS_POR_PAGINA']
+    return max(1, min(por_pagina, app.config['ITENS_POR_PAGINA_MAX']))
+
+def paginar_solicitacoes(stmt, depois=None, antes=None, por_pagina=50):
+    """Executa a consulta paginando por cursor sobre (prazo, id).
+
+    Em vez de OFFSET, filtra a partir da última linha vista, o que permite
+    ao banco percorrer apenas um trecho do índice composto. Retorna a lista
+    de solicitacoes e os cursores da página anterior e da próxima (ou None).
+    """
+    if antes:
+        prazo, id_ = antes
+        stmt = stmt.where(or_(
+            Solicitacao.prazo < prazo,
+            and_(Solicitacao.prazo == prazo, Solicitacao.id < id_),
+        )).order_by(Solicitacao.prazo.desc(), Solicitacao.id.desc())
+    else:
+        stmt = stmt.order_by(Solicitacao.prazo.asc(), Solicitacao.id.asc())
+        if depois:
+            prazo, id_ = depois
+            stmt = stmt.where(or_(
+                Solicitacao.prazo > prazo,
+                and_(Solicitacao.prazo == prazo, Solicitacao.id > id_),
+            ))
+
+    # Busca uma linha a mais só para saber se existe outra página
+    linhas = db.session.execute(stmt.limit(por_pagina + 1)).scalars().all()
+    tem_mais = len(linhas) > por_pagina
+    linhas = linhas[:por_pagina]
+
+    if antes:
+        linhas.reverse()
+        anterior = montar_cursor(linhas[0]) if tem_mais and linhas else None
+        proximo = montar_cursor(linhas[-1]) if linhas else None
+    else:
+        anterior = montar_cursor(linhas[0]) if depois and linhas else None
+        proximo = montar_cursor(linhas[-1]) if tem_mais else None
+
+    return linhas, anterior, proximo
+
+# --- Tarefas em Segundo Plano ---
+PASTA_MINIATURAS = 'miniaturas'
+EXTENSOES_MINIATURA = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.pdf'}
+
+def caminho_do_blob(caminho):
+    """Caminho em disco de um arquivo salvo no banco, dentro da UPLOAD_FOLDER atual."""
+    return os.path.join(app.config['UPLOAD_FOLDER'], storage.nome_do_arquivo(caminho))
+
+def caminho_miniatura(caminho_blob):
+    """Retorna o caminho da miniatura (PNG) de um blob."""
+    nome = os.path.splitext(storage.nome_do_arquivo(caminho_blob))[0] + '.png'
+    return os.path.join(app.config['UPLOAD_FOLDER'], PASTA_MINIATURAS, nome)
+
+def mesmo_arquivo(coluna, nome):
+    """Compara só o nome do arquivo, qualquer que seja a pasta ou o separador salvo."""
+    return or_(coluna == nome,
+               coluna.endswith('/' + nome, autoescape=True),
+               coluna.endswith('\\' + nome, autoescape=True))
+
+def blob_em_uso(caminho):
+    """Confere no banco se alguma solicitacao ou registro de 'arquivos' ainda aponta para o blob."""
+    nome = storage.nome_do_arquivo(caminho)
+    return any(
+        db.session.execute(db.select(coluna).where(mesmo_arquivo(coluna, nome)).limit(1)).first() is not None
+        for coluna in (Solicitacao.arquivo_path, Arquivo.caminho)
+    )
+
+@fila_tarefas.tarefa('remover_arquivo')
+def tarefa_remover_arquivo(caminho):
+    blob = caminho_do_blob(caminho)
+    # Um envio do mesmo conteúdo ainda sem commit renova a data do blob
+    # (storage.salvar_blob); nesse caso quem decide depois é a coleta de órfãos
+    if storage.modificado_depois(blob, time.time() - app.config['GC_CARENCIA']):
+        return
+    # O mesmo conteúdo pode ter sido reenviado depois que a tarefa foi criada
+    if blob_em_uso(caminho):
+        return
+    storage.remover_blob(blob)
+    storage.remover_blob(caminho_miniatura(caminho))
+
+@fila_tarefas.tarefa('gerar_miniatura')
+def tarefa_gerar_miniatura(caminho):
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    origem = caminho_do_blob(caminho)
+    destino = caminho_miniatura(caminho)
+    if os.path.exists(destino) or not os.path.exists(origem):
+        return
+
+    if origem.endswith('.pdf'):
+        try:
+            from pdf2image import convert_from_path
+        except ImportError:
+            return
+        paginas = convert_from_path(origem, first_page=1, last_page=1, size=app.config['MINIATURA_TAMANHO'])
+        if not paginas:
+            return
+        imagem = paginas[0]
+    else:
+        imagem = Image.open(origem)
+    imagem.thumbnail(app.config['MINIATURA_TAMANHO'])
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = destino + '.tmp'
+    imagem.convert('RGB').save(temporario, 'PNG')
+    os.replace(temporario, destino)
+
+    # Muda a versão dos painéis (ETag) para a miniatura aparecer
+    db.session.execute(
+        db.update(Solicitacao).where(Solicitacao.arquivo_path == caminho).values(atualizado_em=AgoraNoBanco())
+    )
+    db.session.commit()
+
+def prefixos_dos_anexos(tamanho_lote):
+    """Pastas (com o separador) que aparecem antes do nome em solicitacao.arquivo_path.
+
+    São poucas, uma por UPLOAD_FOLDER já usada, então a coleta guarda só
+    elas em memória em vez de todos os nomes referenciados.
+    """
+    prefixos = set()
+    for caminho in db.session.execute(
+        db.select(Solicitacao.arquivo_path).where(Solicitacao.arquivo_path.is_not(None)).distinct()
+        .execution_options(yield_per=tamanho_lote)
+    ).scalars():
+        prefixos.add(caminho[:len(caminho) - len(storage.nome_do_arquivo(caminho))])
+    return prefixos
+
+def coletar_orfaos():
+    """Apaga arquivos da pasta de uploads que nenhuma solicitacao referencia.
+
+    Os arquivos em uso são comparados pelo nome, sem a pasta: o caminho
+    salvo no banco depende da UPLOAD_FOLDER da época e do separador do
+    sistema. Arquivos mais novos que GC_CARENCIA são ignorados (envios ainda
+    sem commit, inclusive os que reaproveitam um blob existente, cuja data
+    salvar_blob renova). Também limpa temporários antigos e miniaturas sem o
+    blob de origem. Retorna a quantidade de bytes liberados.
+    """
+    pasta = app.config['UPLOAD_FOLDER']
+    limite = time.time() - app.config['GC_CARENCIA']
+    tamanho_lote = app.config['GC_LOTE']
+    liberados = 0
+
+    def apagar(caminho, tamanho):
+        nonlocal liberados
+        # Confere a data de novo: um envio pode ter reaproveitado o blob durante a varredura
+        if storage.modificado_depois(caminho, limite):
+            return
+        try:
+            os.remove(caminho)
+            liberados += tamanho
+        except FileNotFoundError:
+            pass
+
+    prefixos = prefixos_dos_anexos(tamanho_lote)
+
+    lote = []
+    def processar_lote():
+        # Quais nomes do lote alguma solicitacao usa, com IN nas grafias possíveis
+        nomes = {entrada.name for entrada in lote}
+        grafias = [prefixo + nome for prefixo in prefixos for nome in nomes]
+        em_uso = {storage.nome_do_arquivo(caminho) for caminho in db.session.execute(
+            db.select(Solicitacao.arquivo_path).where(Solicitacao.arquivo_path.in_(grafias))
+        ).scalars()} if grafias else set()
+        orfaos = [entrada for entrada in lote if entrada.name not in em_uso]
+        nomes -= em_uso
+
+        # Registros de 'arquivos' dos blobs órfãos, localizados pelo SHA-256 do nome
+        hashes = {storage.sha256_do_blob(nome) for nome in nomes} - {None}
+        if hashes:
+            registros = [caminho for caminho in db.session.execute(
+                db.select(Arquivo.caminho).where(Arquivo.sha256.in_(hashes))
+            ).scalars() if storage.nome_do_arquivo(caminho) in nomes]
+            if registros:
+                db.session.execute(db.delete(Arquivo).where(Arquivo.caminho.in_(registros)))
+                db.session.commit()
+        for entrada in orfaos:
+            apagar(entrada.path, entrada.stat().st_size)
+        lote.clear()
+
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if entrada.is_file() and entrada.stat().st_mtime < limite:
+                lote.append(entrada)
+                if len(lote) >= tamanho_lote:
+                    processar_lote()
+    if lote:
+        processar_lote()
+
+    blobs = {os.path.splitext(nome)[0] for nome in os.listdir(pasta)}
+    for subpasta, precisa_blob in ((storage.PASTA_TEMPORARIA, False), (PASTA_MINIATURAS, True)):
+        caminho_subpasta = os.path.join(pasta, subpasta)
+        if not os.path.isdir(caminho_subpasta):
+            continue
+        with os.scandir(caminho_subpasta) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or entrada.stat().st_mtime >= limite:
+                    continue
+                if precisa_blob and os.path.splitext(entrada.name)[0] in blobs:
+                    continue
+                apagar(entrada.path, entrada.stat().st_size)
+
+    return liberados
+
+@fila_tarefas.tarefa('coletar_orfaos')
+def tarefa_coletar_orfaos():
+    liberados = coletar_orfaos()
+    if liberados:
+        app.logger.info("Coleta de órfãos liberou %d bytes em uploads.", liberados)
+
+@fila_tarefas.periodica('GC_INTERVALO')
+def agendar_coleta_orfaos():
+    # Vira uma tarefa na fila para que só um processo faça cada varredura
+    if db.session.execute(
+        db.select(Tarefa.id).filter_by(tipo='coletar_orfaos', status='pendente').limit(1)
+    ).first() is None:
+        fila_tarefas.enfileirar('coletar_orfaos')
+        db.session.commit()
+
+# --- Importação em Lote ---
+def numerar_linhas(linhas):
+    """Numera as linhas de uma lista de objetos pela posição, a partir de 1."""
+    return list(enumerate(linhas, start=1))
+
+def ler_linhas_importacao(arquivo):
+    """Lê as linhas de um arquivo CSV (com cabeçalho) ou JSON (lista de objetos).
+
+    Retorna pares (número, linha). No CSV o número é a linha do arquivo, como
+    o usuário a vê no editor (o cabeçalho é a linha 1); no JSON é a posição do
+    objeto na lista.
+    """
+    if storage.extensao_segura(arquivo.filename) == '.json':
+        linhas = json.load(arquivo.stream)
+        if not isinstance(linhas, list) or not all(isinstance(l, dict) for l in linhas):
+            raise ValueError("O JSON deve ser uma lista de objetos.")
+        return numerar_linhas(linhas)
+    texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+    leitor = csv.DictReader(texto)
+    # line_num é a linha em que o registro termina (só muda com quebras de linha dentro de aspas)
+    return [(leitor.line_num, linha) for linha in leitor]
+
+def validar_usuarios(linhas):
+    """Valida os pares (número, linha) de usuários; retorna (válidas, erros) com o número da linha."""
+    validas, erros, vistos = [], [], set()
+    for numero, linha in linhas:
+        username = str(linha.get('username') or '').strip()
+        password = str(linha.get('password') or '')
+        if not username or len(username) > 80:
+            erros.append({'linha': numero, 'erro': "Usuário ausente ou com mais de 80 caracteres."})
+        elif not password:
+            erros.append({'linha': numero, 'erro': "Senha ausente."})
+        elif username in vistos:
+            erros.append({'linha': numero, 'erro': f"Usuário '{username}' repetido no arquivo."})
+        else:
+            vistos.add(username)
+            validas.append((numero, {'username': username, 'password': password}))
+
+    # Usuários que já existem no banco, numa consulta por lote
+    existentes = set()
+    nomes = [dados['username'] for _, dados in validas]
+    tamanho_lote = app.config['IMPORTACAO_TAMANHO_LOTE']
+    for inicio in range(0, len(nomes), tamanho_lote):
+        existentes.update(db.session.execute(
+            db.select(Usuario.username).where(Usuario.username.in_(nomes[inicio:inicio + tamanho_lote]))
+        ).scalars())
+    for numero, dados in validas:
+        if dados['username'] in existentes:
+            erros.append({'linha': numero, 'erro': f"Usuário '{dados['username']}' já existe."})
+    validas = [(numero, dados) for numero, dados in validas if dados['username'] not in existentes]
+
+    # Só as senhas que serão de fato inseridas passam pelo scrypt
+    hashes = servico_hash.gerar_varios([dados.pop('password') for _, dados in validas])
+    for (_, dados), hashed_password in zip(validas, hashes):
+        dados['password_hash'] = hashed_password
+        dados['role'] = 'subordinado'
+    return validas, erros
+
+def validar_solicitacoes(linhas):
+    """Valida os pares (número, linha) de solicitacoes; retorna (válidas, erros) com o número da linha."""
+    candidatas, erros = [], []
+    for numero, linha in linhas:
+        descricao = str(linha.get('descricao') or '').strip()
+        assigned_to = str(linha.get('assigned_to_username') or '').strip()
+        try:
+            prazo = datetime.strptime(str(linha.get('prazo') or ''), '%Y-%m-%d').date()
+        except ValueError:
+            erros.append({'linha': numero, 'erro': "Formato de data inválido. Use AAAA-MM-DD."})
+            continue
+        if not descricao or len(descricao) > 300:
+            erros.append({'linha': numero, 'erro': "Descrição ausente ou com mais de 300 caracteres."})
+        elif not assigned_to:
+            erros.append({'linha': numero, 'erro': "Usuário atribuído ausente."})
+        else:
+            candidatas.append((numero, {'descricao': descricao, 'prazo': prazo,
+                                        'assigned_to_username': assigned_to, 'status': 'Pendente'}))
+
+    nomes = sorted({dados['assigned_to_username'] for _, dados in candidatas})
+    subordinados = set()
+    tamanho_lote = app.config['IMPORTACAO_TAMANHO_LOTE']
+    for inicio in range(0, len(nomes), tamanho_lote):
+        subordinados.update(db.session.execute(
+            db.select(Usuario.username).where(Usuario.role == 'subordinado',
+                                              Usuario.username.in_(nomes[inicio:inicio + tamanho_lote]))
+        ).scalars())
+
+    validas = []
+    for numero, dados in candidatas:
+        if dados['assigned_to_username'] in subordinados:
+            validas.append((numero, dados))
+        else:
+            erros.append({'linha': numero, 'erro': f"Subordinado '{dados['assigned_to_username']}' não encontrado."})
+    return validas, erros
+
+def inserir_em_lotes(modelo, validas, erros):
+    """Insere as linhas em lotes (executemany), todas na transação atual.
+
+    Cada lote roda num SAVEPOINT. Se um lote violar alguma restrição, ele é
+    refeito linha a linha para que o erro fique só na linha culpada.
+    Retorna as linhas inseridas.
+    """
+    inseridas = []
+    tamanho_lote = app.config['IMPORTACAO_TAMANHO_LOTE']
+    for inicio in range(0, len(validas), tamanho_lote):
+        lote = validas[inicio:inicio + tamanho_lote]
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(modelo), [dados for _, dados in lote])
+            inseridas.extend(dados for _, dados in lote)
+            continue
+        except IntegrityError:
+            pass
+        for numero, dados in lote:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(db.insert(modelo), [dados])
+                inseridas.append(dados)
+            except IntegrityError as e:
+                erros.append({'linha': numero, 'erro': f"Violação de integridade: {e.orig}"})
+    return inseridas
+
+def importar_linhas(tipo, linhas):
+    """Valida e importa um lote de usuários ou solicitacoes numa única transação.
+
+    'linhas' são pares (número, linha), como os de ler_linhas_importacao.
+    """
+    if tipo == 'usuarios':
+        validas, erros = validar_usuarios(linhas)
+        inseridas = inserir_em_lotes(Usuario, validas, erros)
+    else:
+        validas, erros = validar_solicitacoes(linhas)
+        inseridas = inserir_em_lotes(Solicitacao, validas, erros)
+        contagem = Counter((dados['assigned_to_username'], dados['prazo']) for dados in inseridas)
+        for (username, prazo), quantidade in contagem.items():
+            ajustar_resumo(username, prazo, 'pendentes', quantidade)
+    db.session.commit()
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {'tipo': tipo, 'total': len(linhas), 'inseridos': len(inseridas), 'erros': erros}
 
 # --- Rotas da Aplicação (Páginas do Site) ---
 @app.route('/')
@@ -142,7 +891,14 @@ def login():
         password = request.form['password']
         user = db.session.execute(db.select(Usuario).filter_by(username=username)).scalar_one_or_none()
         
-        if user and check_password_hash(user.password_hash, password):
+        if user and servico_hash.verificar(user.password_hash, password):
+            # Atualiza hashes gerados com parâmetros antigos, já que a senha está em mãos
+            if servico_hash.precisa_rehash(user.password_hash):
+                try:
+                    user.password_hash = servico_hash.gerar(password)
+                    db.session.commit()
+                except hashing.ServicoSobrecarregado:
+                    pass
             session['logged_in'] = True
             session['username'] = user.username
             session['role'] = user.role
@@ -169,7 +925,7 @@ def register():
         username = request.form['username']
         password = request.form['password']
         
-        hashed_password = generate_password_hash(password)
+        hashed_password = servico_hash.gerar(password)
         new_admin = Usuario(username=username, password_hash=hashed_password, role='admin')
         
         try:
@@ -188,19 +944,35 @@ def register():
 @admin_required
 def admin_dashboard():
     selected_sub = request.args.get('subordinate')
+    por_pagina = ler_itens_por_pagina()
+
+    # Se nada mudou desde a última visita, responde 304 sem consultar nem renderizar
+    etag = etag_painel(versao_solicitacoes(), versao_subordinados())
+    nao_modificado = resposta_nao_modificada(etag)
+    if nao_modificado:
+        return nao_modificado
     
-    stmt = db.select(Solicitacao).order_by(Solicitacao.prazo.asc())
+    stmt = db.select(Solicitacao)
 
     if selected_sub:
         stmt = stmt.filter_by(assigned_to_username=selected_sub)
     
-    solicitacoes = db.session.execute(stmt).scalars().all() 
-    solicitacoes_processadas = [processar_solicitacao(o) for o in solicitacoes]
+    solicitacoes, anterior, proximo = paginar_solicitacoes(
+        stmt,
+        depois=ler_cursor(request.args.get('depois')),
+        antes=ler_cursor(request.args.get('antes')),
+        por_pagina=por_pagina,
+    )
+    solicitacoes_processadas = adicionar_miniaturas(solicitacoes, list(processar_solicitacoes(solicitacoes)))
     
-    return render_template('admin.html', 
+    return resposta_painel(etag, render_template('admin.html', 
                            solicitacoes=solicitacoes_processadas, 
                            subordinates=get_subordinates(), 
-                           selected_sub=selected_sub)
+                           resumo=resumo_por_subordinado(),
+                           selected_sub=selected_sub,
+                           por_pagina=por_pagina,
+                           cursor_anterior=anterior,
+                           cursor_proximo=proximo))
 
 @app.route('/admin/create_subordinate_page')
 @admin_required
@@ -213,7 +985,7 @@ def admin_create_subordinate():
     username = request.form['username']
     password = request.form['password']
     
-    hashed_password = generate_password_hash(password)
+    hashed_password = servico_hash.gerar(password)
     new_subordinate = Usuario(username=username, password_hash=hashed_password, role='subordinado')
 
     try:
@@ -226,6 +998,41 @@ def admin_create_subordinate():
         flash(f"Usuário '{username}' já existe.", 'danger')
         return redirect(url_for('create_subordinate_page'))
 
+@app.route('/admin/importar', methods=['GET', 'POST'])
+@admin_required
+def importar():
+    if request.method == 'GET':
+        return render_template('importar.html')
+
+    # Aceita JSON ({"tipo": ..., "linhas": [...]}) ou um arquivo CSV/JSON no formulário
+    if request.is_json:
+        dados = request.get_json(silent=True) or {}
+        tipo, linhas = dados.get('tipo'), dados.get('linhas')
+        if tipo not in ('usuarios', 'solicitacoes') or not isinstance(linhas, list) \
+                or not all(isinstance(l, dict) for l in linhas):
+            return jsonify(erro="Envie 'tipo' (usuarios ou solicitacoes) e 'linhas' (lista de objetos)."), 400
+        return jsonify(importar_linhas(tipo, numerar_linhas(linhas)))
+
+    tipo = request.form.get('tipo')
+    arquivo = request.files.get('arquivo')
+    if tipo not in ('usuarios', 'solicitacoes'):
+        flash("Tipo de importação inválido.", "danger")
+        return redirect(url_for('importar'))
+    if not arquivo or arquivo.filename == '':
+        flash("Nenhum arquivo selecionado.", "warning")
+        return redirect(url_for('importar'))
+
+    try:
+        linhas = ler_linhas_importacao(arquivo)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        flash(f"Não foi possível ler o arquivo: {e}", "danger")
+        return redirect(url_for('importar'))
+
+    relatorio = importar_linhas(tipo, linhas)
+    flash(f"{relatorio['inseridos']} de {relatorio['total']} linhas importadas.",
+          "success" if not relatorio['erros'] else "warning")
+    return render_template('importar.html', relatorio=relatorio)
+
 @app.route('/adicionar_solicitacao', methods=['POST'])
 @admin_required
 def adicionar_solicitacao():
@@ -246,6 +1053,7 @@ def adicionar_solicitacao():
     )
     
     db.session.add(nova_solicitacao)
+    ajustar_resumo(assigned_to, prazo, 'pendentes', 1)
     db.session.commit()
     flash("Nova solicitacao de serviço adicionada com sucesso.", "success")
     return redirect(url_for('admin_dashboard'))
@@ -254,29 +1062,136 @@ def adicionar_solicitacao():
 @admin_required
 def deletar_solicitacao(id):
     solicitacao_para_deletar = db.get_or_404(Solicitacao, id)
-    
-    if solicitacao_para_deletar.arquivo_path and os.path.exists(solicitacao_para_deletar.arquivo_path):
-        try:
-            os.remove(solicitacao_para_deletar.arquivo_path)
-        except OSError as e:
-            flash(f"Erro ao deletar arquivo associado: {e}", "danger")
+    caminho = solicitacao_para_deletar.arquivo_path
+    # O blob só é apagado depois do commit, pela fila, e quando ninguém mais o usa
+    if caminho and liberar_referencia(caminho):
+        fila_tarefas.enfileirar('remover_arquivo', caminho=caminho)
+    ajustar_resumo(solicitacao_para_deletar.assigned_to_username, solicitacao_para_deletar.prazo,
+                   categoria_resumo(solicitacao_para_deletar), -1)
             
     db.session.delete(solicitacao_para_deletar)
     db.session.commit()
     flash("solicitacao de serviço deletada com sucesso.", "success")
     return redirect(url_for('admin_dashboard'))
 
+# --- Exportação e API ---
+def linhas_exportacao(selected_sub=None):
+    """Percorre as solicitacoes em ordem de prazo, em blocos, sem carregar a tabela inteira.
+
+    Com yield_per o SQLAlchemy usa um cursor do lado do servidor (SSCursor
+    no PyMySQL), então a memória fica constante qualquer que seja a tabela.
+    """
+    stmt = db.select(*COLUNAS_SOLICITACAO).order_by(Solicitacao.prazo.asc(), Solicitacao.id.asc())
+    if selected_sub:
+        stmt = stmt.where(Solicitacao.assigned_to_username == selected_sub)
+    stmt = stmt.execution_options(yield_per=app.config['EXPORTACAO_YIELD_PER'])
+    return processar_solicitacoes(db.session.execute(stmt))
+
+class _EcoCSV:
+    """'Arquivo' cujo write devolve o texto, para o csv.writer gerar strings."""
+    def write(self, valor):
+        return valor
+
+def resposta_exportacao(partes, mimetype, nome_arquivo):
+    """Resposta em streaming: o primeiro bloco sai antes de a consulta terminar."""
+    response = Response(stream_with_context(partes), mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=nome_arquivo)
+    # Evita que o nginx acumule a resposta inteira antes de repassá-la
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/admin/export.csv')
+@admin_required
+def exportar_csv():
+    selected_sub = request.args.get('subordinate')
+
+    def gerar():
+        writer = csv.DictWriter(_EcoCSV(), fieldnames=CAMPOS_SOLICITACAO)
+        yield writer.writeheader()
+        bloco = []
+        for linha in linhas_exportacao(selected_sub):
+            bloco.append(writer.writerow(linha))
+            if len(bloco) >= 500:
+                yield ''.join(bloco)
+                bloco = []
+        yield ''.join(bloco)
+
+    return resposta_exportacao(gerar(), 'text/csv', 'solicitacoes.csv')
+
+@app.route('/admin/export.ndjson')
+@admin_required
+def exportar_ndjson():
+    selected_sub = request.args.get('subordinate')
+
+    def gerar():
+        bloco = []
+        for linha in linhas_exportacao(selected_sub):
+            bloco.append(json.dumps(linha, ensure_ascii=False) + '\n')
+            if len(bloco) >= 500:
+                yield ''.join(bloco)
+                bloco = []
+        yield ''.join(bloco)
+
+    return resposta_exportacao(gerar(), 'application/x-ndjson', 'solicitacoes.ndjson')
+
+@app.route('/api/solicitacoes')
+@login_required
+def api_solicitacoes():
+    # Subordinados só enxergam as próprias solicitacoes
+    if session.get('role') == 'admin':
+        selected_sub = request.args.get('subordinate')
+    else:
+        selected_sub = session['username']
+    por_pagina = ler_itens_por_pagina()
+
+    stmt = db.select(Solicitacao)
+    if selected_sub:
+        stmt = stmt.filter_by(assigned_to_username=selected_sub)
+    solicitacoes, anterior, proximo = paginar_solicitacoes(
+        stmt,
+        depois=ler_cursor(request.args.get('depois')),
+        antes=ler_cursor(request.args.get('antes')),
+        por_pagina=por_pagina,
+    )
+
+    return jsonify(
+        solicitacoes=list(processar_solicitacoes(solicitacoes)),
+        por_pagina=por_pagina,
+        cursor_anterior=anterior,
+        cursor_proximo=proximo,
+        anterior=url_for('api_solicitacoes', subordinate=request.args.get('subordinate'),
+                         antes=anterior, por_pagina=por_pagina) if anterior else None,
+        proximo=url_for('api_solicitacoes', subordinate=request.args.get('subordinate'),
+                        depois=proximo, por_pagina=por_pagina) if proximo else None,
+    )
+
 # --- Rotas Exclusivas do Subordinado ---
 @app.route('/subordinate/dashboard')
 @subordinate_required
 def subordinate_dashboard():
+    por_pagina = ler_itens_por_pagina()
+
+    etag = etag_painel(versao_solicitacoes(session['username']))
+    nao_modificado = resposta_nao_modificada(etag)
+    if nao_modificado:
+        return nao_modificado
+
     stmt = db.select(Solicitacao).filter_by(
         assigned_to_username=session['username']
-    ).order_by(Solicitacao.prazo.asc())
+    )
     
-    solicitacao = db.session.execute(stmt).scalars().all()
-    solicitacao_processadas = [processar_solicitacao(o) for o in solicitacao]
-    return render_template('subordinate.html', solicitacao=solicitacao_processadas)
+    solicitacao, anterior, proximo = paginar_solicitacoes(
+        stmt,
+        depois=ler_cursor(request.args.get('depois')),
+        antes=ler_cursor(request.args.get('antes')),
+        por_pagina=por_pagina,
+    )
+    solicitacao_processadas = list(processar_solicitacoes(solicitacao))
+    return resposta_painel(etag, render_template('subordinate.html',
+                           solicitacao=solicitacao_processadas,
+                           por_pagina=por_pagina,
+                           cursor_anterior=anterior,
+                           cursor_proximo=proximo))
 
 @app.route('/upload_arquivo/<int:id>', methods=['POST'])
 @subordinate_required
@@ -294,23 +1209,107 @@ def upload_arquivo(id):
         flash("solicitacao de serviço não encontrada ou não pertence a você.", "danger")
         return redirect(url_for('subordinate_dashboard'))
     
-    filename = f"{id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{arquivo.filename}"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    arquivo.save(filepath)
+    # O conteúdo já foi gravado e o hash calculado durante a leitura do
+    # formulário (RequisicaoGsme); aqui o blob só recebe o nome definitivo
+    sha256, filepath, tamanho = arquivo.stream.salvar(storage.extensao_segura(arquivo.filename))
+
+    # Um reenvio substitui o anexo anterior, que perde uma referência
+    caminho_anterior = solicitacao.arquivo_path
+    if caminho_anterior != filepath:
+        registrar_referencia(sha256, filepath, tamanho)
+        if caminho_anterior and liberar_referencia(caminho_anterior):
+            fila_tarefas.enfileirar('remover_arquivo', caminho=caminho_anterior)
+    if app.config['MINIATURAS_ATIVAS'] and os.path.splitext(filepath)[1] in EXTENSOES_MINIATURA \
+            and not os.path.exists(caminho_miniatura(filepath)):
+        fila_tarefas.enfileirar('gerar_miniatura', caminho=filepath)
 
+    categoria_anterior = categoria_resumo(solicitacao)
     solicitacao.arquivo_path = filepath
     solicitacao.status = 'Entregue'
     solicitacao.data_entrega = date.today()
+    categoria_atual = categoria_resumo(solicitacao)
+    if categoria_atual != categoria_anterior:
+        ajustar_resumo(solicitacao.assigned_to_username, solicitacao.prazo, categoria_anterior, -1)
+        ajustar_resumo(solicitacao.assigned_to_username, solicitacao.prazo, categoria_atual, 1)
     
     db.session.commit()
     flash("Arquivo enviado e solicitacao marcada como 'Entregue'.", "success")
     return redirect(url_for('subordinate_dashboard'))
 
+@app.errorhandler(RequestEntityTooLarge)
+def arquivo_muito_grande(e):
+    flash("Arquivo maior que o tamanho máximo permitido.", "danger")
+    return redirect(url_for('home'))
+
+@app.errorhandler(storage.ArquivoMuitoGrande)
+def anexo_muito_grande(e):
+    # Lançada pela gravação do anexo, enquanto o corpo ainda é lido
+    flash("Arquivo maior que o tamanho máximo permitido.", "danger")
+    return redirect(url_for('subordinate_dashboard'))
+
 # --- Rota para Download de Arquivos ---
 @app.route('/uploads/<filename>')
 @login_required
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+    # Blobs são nomeados pelo SHA-256 do conteúdo, que já serve de ETag forte
+    sha256 = storage.sha256_do_blob(filename)
+    accel_prefix = app.config['UPLOAD_ACCEL_REDIRECT']
+
+    if accel_prefix:
+        caminho = safe_join(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']), filename)
+        if caminho is None or not os.path.isfile(caminho):
+            abort(404)
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+        if sha256:
+            response.set_etag(sha256)
+            response.make_conditional(request)
+    else:
+        # send_from_directory trata If-None-Match, If-Modified-Since e Range (206)
+        response = send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                       as_attachment=True, etag=sha256 or True)
+        # Anuncia o suporte a Range também na resposta completa (downloads retomáveis)
+        response.accept_ranges = 'bytes'
+
+    # Os arquivos exigem login, então nunca ficam em caches compartilhados
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if sha256:
+        response.cache_control.max_age = app.config['UPLOAD_CACHE_MAX_AGE']
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/miniaturas/<filename>')
+@login_required
+def miniatura(filename):
+    response = send_from_directory(os.path.join(app.config['UPLOAD_FOLDER'], PASTA_MINIATURAS), filename)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+# --- Comandos de Linha de Comando ---
+@app.cli.command('reconstruir-resumo')
+def reconstruir_resumo_command():
+    """Recalcula a tabela resumo_solicitacao (use antes de ativar RESUMO_INCREMENTAL)."""
+    reconstruir_resumo()
+    print("Resumo por usuário reconstruído.")
+
+@app.cli.command('coletar-orfaos')
+def coletar_orfaos_command():
+    """Apaga arquivos de uploads que nenhuma solicitacao referencia."""
+    print(f"{coletar_orfaos()} bytes liberados.")
+
+@app.cli.command('construir-estaticos')
+def construir_estaticos_command():
+    """Gera as versões comprimidas de static/ (também feito ao iniciar o app)."""
+    arquivos_estaticos.construir()
+    for original, versionado in sorted(arquivos_estaticos.manifesto.items()):
+        print(f"{original} -> {versionado}")
 
 
 # --- Ponto de Partida da Aplicação ---
@@ -0,0 +1,81 @@
+"""Micro-benchmark do serviço de hash: logins por segundo por tamanho de pool.
+
+Simula uma rajada de logins com várias threads (como as de um servidor WSGI)
+chamando ServicoHash.verificar, e mede quantas verificações terminam por
+segundo e quantas foram recusadas com 503 por fila cheia.
+
+    python benchmarks/bench_login.py --pools 0,1,2,4 --threads 16 --duracao 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import hashing  # noqa: E402
+
+
+def medir(workers, threads, duracao, metodo, fila):
+    config = {'HASH_METODO': metodo, 'HASH_WORKERS': workers,
+              'HASH_FILA': fila, 'HASH_TIMEOUT': 60}
+    servico = hashing.ServicoHash(config)
+    password_hash = generate_password_hash('senha', metodo)
+    servico.verificar(password_hash, 'senha')  # aquece o pool
+
+    contagem = {'logins': 0, 'recusados': 0}
+    lock = threading.Lock()
+    fim = time.perf_counter() + duracao
+
+    def rodar():
+        while time.perf_counter() < fim:
+            try:
+                servico.verificar(password_hash, 'senha')
+                chave = 'logins'
+            except hashing.ServicoSobrecarregado:
+                chave = 'recusados'
+                time.sleep(0.001)
+            with lock:
+                contagem[chave] += 1
+
+    inicio = time.perf_counter()
+    trabalhadores = [threading.Thread(target=rodar) for _ in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+    servico.encerrar()
+
+    return {'workers': workers, 'threads': threads, 'segundos': round(decorrido, 3),
+            'logins': contagem['logins'], 'recusados': contagem['recusados'],
+            'logins_por_segundo': round(contagem['logins'] / decorrido, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pools', default='0,1,2,4', help="tamanhos de pool, separados por vírgula (0 = na thread)")
+    parser.add_argument('--threads', type=int, default=16, help="threads simulando o servidor WSGI")
+    parser.add_argument('--duracao', type=float, default=5.0, help="segundos por tamanho de pool")
+    parser.add_argument('--fila', type=int, default=16, help="valor de HASH_FILA")
+    parser.add_argument('--metodo', default='scrypt:32768:8:1', help="valor de HASH_METODO")
+    parser.add_argument('--json', action='store_true', help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    resultados = [medir(int(p), args.threads, args.duracao, args.metodo, args.fila)
+                  for p in args.pools.split(',')]
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    print(f"{'workers':>8} {'logins/s':>10} {'logins':>8} {'503':>8}")
+    for r in resultados:
+        print(f"{r['workers']:>8} {r['logins_por_segundo']:>10} {r['logins']:>8} {r['recusados']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+"""Benchmark de carga reproduzível dos painéis, do login, do envio e do download.
+
+Cria um banco local (SQLite por padrão) com volumes configuráveis, gerados
+com uma semente fixa, e exercita login, admin_dashboard (com e sem filtro),
+subordinate_dashboard, upload_arquivo e uploaded_file de duas formas: pelo
+cliente de testes do Flask (latência de uma requisição por vez) e por um
+servidor WSGI com várias threads (vazão sob concorrência). O resultado sai
+em JSON com p50/p95/p99, vazão e memória (RSS) de cada cenário. Com
+--baseline, é comparado a uma execução anterior e o script termina com
+código 1 se algum cenário piorar além da tolerância.
+
+Cada cenário (e, no modo WSGI, cada thread) usa o seu próprio gerador
+aleatório com semente derivada de --semente, então a sequência de
+requisições se repete entre execuções.
+
+    # Na máquina de referência, grava a linha de base
+    python benchmarks/carga.py --subordinados 1000 --solicitacoes 500000 \\
+        --saida benchmarks/baseline.json
+    # Depois de cada mudança, compara com ela
+    python benchmarks/carga.py --subordinados 1000 --solicitacoes 500000 \\
+        --saida resultado.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import gc
+import http.cookiejar
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENHA = 'benchmark'
+ADMIN = 'bench_admin'
+# Aumento de RSS (MB) tolerado além da tolerância relativa, para o ruído do alocador
+FOLGA_MEMORIA_MB = 5
+
+
+def parse_tamanho(valor):
+    """Converte '10KB', '2MB' ou '512' em bytes."""
+    valor = valor.strip().upper()
+    for sufixo, fator in (('KB', 1024), ('MB', 1024 ** 2), ('GB', 1024 ** 3), ('B', 1)):
+        if valor.endswith(sufixo):
+            return int(float(valor[:-len(sufixo)]) * fator)
+    return int(valor)
+
+
+def percentis(latencias):
+    ordenadas = sorted(latencias)
+    def p(q):
+        return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000
+    return {'p50_ms': round(p(0.50), 3), 'p95_ms': round(p(0.95), 3), 'p99_ms': round(p(0.99), 3),
+            'media_ms': round(statistics.fmean(ordenadas) * 1000, 3)}
+
+
+def rss_atual_mb():
+    """RSS atual do processo (Linux: /proc/self/statm; senão, o pico acumulado)."""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MedidorMemoria:
+    """Amostra o RSS numa thread enquanto um cenário roda e guarda o maior valor.
+
+    O pico do processo inteiro (ru_maxrss) incluiria a semeadura do banco;
+    aqui conta só o quanto a memória cresceu durante o cenário.
+    """
+
+    def __init__(self, intervalo=0.01):
+        self.intervalo = intervalo
+
+    def __enter__(self):
+        gc.collect()
+        self.inicio = self.pico = rss_atual_mb()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, rss_atual_mb())
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.pico = max(self.pico, rss_atual_mb())
+
+    def resultado(self):
+        return {'rss_inicio_mb': round(self.inicio, 1), 'rss_pico_mb': round(self.pico, 1),
+                'rss_aumento_mb': round(self.pico - self.inicio, 1)}
+
+
+# --- Dados ---
+def semear(gsme, args, rng):
+    """Cria as tabelas e insere usuários e solicitacoes em lotes."""
+    app, db = gsme.app, gsme.db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        password_hash = gsme.servico_hash.gerar(SENHA)
+
+        subordinados = [f'sub{i:05d}' for i in range(args.subordinados)]
+        usuarios = [{'username': ADMIN, 'password_hash': password_hash, 'role': 'admin'}]
+        usuarios += [{'username': u, 'password_hash': password_hash, 'role': 'subordinado'} for u in subordinados]
+        db.session.execute(db.insert(gsme.Usuario), usuarios)
+
+        hoje = date.today()
+        lote = []
+        for i in range(args.solicitacoes):
+            prazo = hoje + timedelta(days=rng.randint(-365, 365))
+            entregue = rng.random() < 0.5
+            lote.append({
+                'descricao': f'Solicitação de benchmark {i}',
+                'prazo': prazo,
+                'status': 'Entregue' if entregue else 'Pendente',
+                'assigned_to_username': rng.choice(subordinados),
+                'data_entrega': prazo + timedelta(days=rng.randint(-10, 10)) if entregue else None,
+            })
+            if len(lote) >= 10000:
+                db.session.execute(db.insert(gsme.Solicitacao), lote)
+                lote = []
+        if lote:
+            db.session.execute(db.insert(gsme.Solicitacao), lote)
+        db.session.commit()
+        gsme.reconstruir_resumo()
+    return subordinados
+
+
+def preparar_uploads(gsme, subordinado, tamanhos, rng):
+    """Escolhe as solicitacoes do envio e gera um conteúdo aleatório de cada tamanho."""
+    app = gsme.app
+    with app.app_context():
+        ids = gsme.db.session.execute(
+            gsme.db.select(gsme.Solicitacao.id).filter_by(assigned_to_username=subordinado)
+            .order_by(gsme.Solicitacao.id)
+        ).scalars().all()
+    conteudos = [rng.randbytes(tamanho) for tamanho in tamanhos]
+    return ids, conteudos
+
+
+# --- Cenários ---
+def cenarios(subordinados, ids_upload, conteudos, blobs):
+    """Retorna {nome: (usuário, função(cliente, rng) -> status)} para ambos os modos."""
+    sub = subordinados[0]
+    return {
+        'login': (None, lambda c, r: c.post('/login', {'username': sub, 'password': SENHA})),
+        'admin_dashboard': (ADMIN, lambda c, r: c.get('/admin/dashboard')),
+        'admin_dashboard_filtrado': (ADMIN, lambda c, r: c.get(
+            '/admin/dashboard?' + urllib.parse.urlencode({'subordinate': r.choice(subordinados)}))),
+        'subordinate_dashboard': (sub, lambda c, r: c.get('/subordinate/dashboard')),
+        'upload_arquivo': (sub, lambda c, r: c.upload(
+            f'/upload_arquivo/{r.choice(ids_upload)}', r.choice(conteudos))),
+        'uploaded_file': (sub, lambda c, r: c.get('/uploads/' + r.choice(blobs))),
+    }
+
+
+class ClienteTeste:
+    """Adapta o cliente de testes do Flask à interface dos cenários."""
+
+    def __init__(self, app, usuario, role):
+        self.client = app.test_client()
+        if usuario:
+            with self.client.session_transaction() as sess:
+                sess.update(logged_in=True, username=usuario, role=role)
+
+    def get(self, url):
+        return self.client.get(url).status_code
+
+    def post(self, url, dados):
+        return self.client.post(url, data=dados).status_code
+
+    def upload(self, url, conteudo):
+        return self.client.post(url, data={'arquivo': (io.BytesIO(conteudo), 'bench.pdf')}).status_code
+
+
+class ClienteHTTP:
+    """Cliente HTTP de verdade (urllib), com cookies, contra o servidor WSGI."""
+
+    def __init__(self, base, usuario):
+        self.base = base
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), SemRedirecionar())
+        if usuario:
+            self.post('/login', {'username': usuario, 'password': SENHA})
+
+    def _abrir(self, requisicao):
+        try:
+            with self.opener.open(requisicao, timeout=60) as resposta:
+                resposta.read()
+                return resposta.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def get(self, url):
+        return self._abrir(urllib.request.Request(self.base + url))
+
+    def post(self, url, dados):
+        return self._abrir(urllib.request.Request(
+            self.base + url, data=urllib.parse.urlencode(dados).encode(), method='POST'))
+
+    def upload(self, url, conteudo):
+        fronteira = 'benchmarkfronteira'
+        corpo = (f'--{fronteira}\r\nContent-Disposition: form-data; name="arquivo"; filename="bench.pdf"\r\n'
+                 f'Content-Type: application/pdf\r\n\r\n').encode() + conteudo + f'\r\n--{fronteira}--\r\n'.encode()
+        return self._abrir(urllib.request.Request(
+            self.base + url, data=corpo, method='POST',
+            headers={'Content-Type': f'multipart/form-data; boundary={fronteira}'}))
+
+
+class SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    """Mede só a própria requisição, sem seguir o redirect do POST."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def medir_sequencial(app, usuario, acao, requisicoes, semente):
+    cliente = ClienteTeste(app, usuario, 'admin' if usuario == ADMIN else 'subordinado')
+    rng = random.Random(semente)
+    latencias, erros = [], 0
+    with MedidorMemoria() as memoria:
+        inicio = time.perf_counter()
+        for _ in range(requisicoes):
+            t0 = time.perf_counter()
+            status = acao(cliente, rng)
+            latencias.append(time.perf_counter() - t0)
+            erros += status >= 400
+        decorrido = time.perf_counter() - inicio
+    return dict(percentis(latencias), requisicoes=requisicoes, erros=erros,
+                vazao_rps=round(requisicoes / decorrido, 2), **memoria.resultado())
+
+
+def medir_concorrente(base, usuario, acao, requisicoes, threads, semente):
+    # Os logins (scrypt) acontecem antes de o relógio começar a contar
+    clientes = [ClienteHTTP(base, usuario) for _ in range(threads)]
+    cotas = [requisicoes // threads + (i < requisicoes % threads) for i in range(threads)]
+    latencias, erros = [], []
+
+    def thread(indice):
+        cliente, rng = clientes[indice], random.Random(f'{semente}:{indice}')
+        for _ in range(cotas[indice]):
+            t0 = time.perf_counter()
+            status = acao(cliente, rng)
+            latencias.append(time.perf_counter() - t0)
+            if status >= 400:
+                erros.append(status)
+
+    with MedidorMemoria() as memoria:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(thread, range(threads)))
+        decorrido = time.perf_counter() - inicio
+    return dict(percentis(latencias), requisicoes=requisicoes, erros=len(erros),
+                vazao_rps=round(requisicoes / decorrido, 2), threads=threads, **memoria.resultado())
+
+
+# --- Comparação com a linha de base ---
+def comparar(resultado, baseline, tolerancia):
+    """Lista as regressões de p95, vazão e aumento de memória acima da tolerância."""
+    regressoes = []
+    for modo, cenarios_base in baseline.get('resultados', {}).items():
+        for nome, base in cenarios_base.items():
+            atual = resultado['resultados'].get(modo, {}).get(nome)
+            if atual is None:
+                continue
+            if atual['p95_ms'] > base['p95_ms'] * (1 + tolerancia):
+                regressoes.append(f"{modo}/{nome}: p95 {atual['p95_ms']} ms > {base['p95_ms']} ms")
+            if atual['vazao_rps'] < base['vazao_rps'] * (1 - tolerancia):
+                regressoes.append(f"{modo}/{nome}: vazão {atual['vazao_rps']} < {base['vazao_rps']} req/s")
+            if 'rss_aumento_mb' in base and \
+                    atual['rss_aumento_mb'] > base['rss_aumento_mb'] * (1 + tolerancia) + FOLGA_MEMORIA_MB:
+                regressoes.append(f"{modo}/{nome}: memória +{atual['rss_aumento_mb']} MB "
+                                  f"> +{base['rss_aumento_mb']} MB")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="URI do banco (padrão: SQLite num diretório temporário)")
+    parser.add_argument('--subordinados', type=int, default=1000)
+    parser.add_argument('--solicitacoes', type=int, default=500000)
+    parser.add_argument('--uploads', default='10KB,1MB,10MB', help="tamanhos dos arquivos enviados")
+    parser.add_argument('--requisicoes', type=int, default=200, help="requisições por cenário")
+    parser.add_argument('--threads', type=int, default=8, help="clientes simultâneos no modo WSGI")
+    parser.add_argument('--cenarios', help="cenários a rodar, separados por vírgula (padrão: todos)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--sem-semear', action='store_true', help="reaproveita os dados já existentes em --db")
+    parser.add_argument('--saida', help="arquivo JSON para o resultado (padrão: stdout)")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.20, help="piora aceitável (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='gsme-bench-')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = args.db or f"sqlite:///{os.path.join(pasta, 'gsme.db')}"
+    sys.path.insert(0, RAIZ)
+    import app as gsme  # noqa: E402  (depois de definir o banco)
+
+    # Sem tarefas em segundo plano, para medições comparáveis entre execuções
+    gsme.app.config.update(UPLOAD_FOLDER=os.path.join(pasta, 'uploads'), TAREFAS_ATIVAS=False)
+    os.makedirs(gsme.app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    rng = random.Random(args.semente)
+    t0 = time.perf_counter()
+    if args.sem_semear:
+        with gsme.app.app_context():
+            subordinados = gsme.get_subordinates()
+    else:
+        subordinados = semear(gsme, args, rng)
+    tempo_semeadura = time.perf_counter() - t0
+
+    tamanhos = [parse_tamanho(t) for t in args.uploads.split(',')]
+    ids_upload, conteudos = preparar_uploads(gsme, subordinados[0], tamanhos, rng)
+    with gsme.app.app_context():
+        blobs = [os.path.basename(gsme.storage.salvar_blob(
+            io.BytesIO(c), gsme.app.config['UPLOAD_FOLDER'], '.pdf')[1]) for c in conteudos]
+
+    todos = cenarios(subordinados, ids_upload, conteudos, blobs)
+    escolhidos = args.cenarios.split(',') if args.cenarios else list(todos)
+
+    resultados = {'test_client': {}, 'wsgi': {}}
+    for nome in escolhidos:
+        usuario, acao = todos[nome]
+        resultados['test_client'][nome] = medir_sequencial(
+            gsme.app, usuario, acao, args.requisicoes, f'{args.semente}:{nome}')
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class SemLog(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    servidor = make_server('127.0.0.1', 0, gsme.app, threaded=True, request_handler=SemLog)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{servidor.server_port}'
+    try:
+        for nome in escolhidos:
+            usuario, acao = todos[nome]
+            resultados['wsgi'][nome] = medir_concorrente(
+                base, usuario, acao, args.requisicoes, args.threads, f'{args.semente}:{nome}')
+    finally:
+        servidor.shutdown()
+        gsme.servico_hash.encerrar()
+
+    resultado = {
+        'config': {'banco': gsme.app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+                   'subordinados': args.subordinados, 'solicitacoes': args.solicitacoes,
+                   'uploads_bytes': tamanhos, 'requisicoes': args.requisicoes,
+                   'threads': args.threads, 'semente': args.semente},
+        'semeadura_s': round(tempo_semeadura, 2),
+        # Pico do processo inteiro, semeadura incluída (só informativo)
+        'pico_rss_processo_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'resultados': resultados,
+    }
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressoes = comparar(resultado, json.load(f), args.tolerancia)
+        if regressoes:
+            print("REGRESSÕES EM RELAÇÃO À LINHA DE BASE:", file=sys.stderr)
+            for regressao in regressoes:
+                print(f"  {regressao}", file=sys.stderr)
+            sys.exit(1)
+        print("Sem regressões em relação à linha de base.", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,5 +20,62 @@ CREATE TABLE IF NOT EXISTS solicitacao (
     status VARCHAR(50),
     data_entrega DATE,
     assigned_to_username VARCHAR(255),
-    FOREIGN KEY (assigned_to_username) REFERENCES usuarios(username)
+    -- Momento da última alteração, usado no ETag dos painéis
+    atualizado_em DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (assigned_to_username) REFERENCES usuarios(username),
+    -- Índices compostos para a paginação por cursor (prazo, id) dos painéis.
+    -- O segundo também atende a chave estrangeira e o filtro por usuário.
+    INDEX ix_solicitacao_prazo_id (prazo, id),
+    INDEX ix_solicitacao_assignee_prazo_id (assigned_to_username, prazo, id),
+    -- Índices para a consulta de versão (MAX(atualizado_em) e COUNT) dos painéis
+    INDEX ix_solicitacao_atualizado_em (atualizado_em),
+    INDEX ix_solicitacao_assignee_atualizado_em (assigned_to_username, atualizado_em),
+    -- Busca por anexo (coleta de órfãos e miniaturas)
+    INDEX ix_solicitacao_arquivo_path (arquivo_path)
+);
+
+-- Para bancos já existentes, crie os índices e colunas novas manualmente:
+-- CREATE INDEX ix_solicitacao_prazo_id ON solicitacao (prazo, id);
+-- CREATE INDEX ix_solicitacao_assignee_prazo_id ON solicitacao (assigned_to_username, prazo, id);
+-- ALTER TABLE solicitacao ADD COLUMN atualizado_em DATETIME(6) NOT NULL
+--     DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+-- CREATE INDEX ix_solicitacao_atualizado_em ON solicitacao (atualizado_em);
+-- CREATE INDEX ix_solicitacao_assignee_atualizado_em ON solicitacao (assigned_to_username, atualizado_em);
+-- CREATE INDEX ix_solicitacao_arquivo_path ON solicitacao (arquivo_path);
+
+-- Cria a tabela de arquivos enviados se ela não existir.
+-- Cada arquivo é guardado uma única vez em disco, com o nome igual ao SHA-256 do conteúdo;
+-- 'referencias' conta quantas solicitações apontam para ele (solicitacao.arquivo_path = caminho).
+CREATE TABLE IF NOT EXISTS arquivos (
+    caminho VARCHAR(300) PRIMARY KEY,
+    sha256 CHAR(64) NOT NULL,
+    tamanho BIGINT NOT NULL,
+    referencias INT NOT NULL DEFAULT 0
+);
+
+-- Cria a tabela de resumo por usuário se ela não existir (opcional, ver RESUMO_INCREMENTAL em app.py).
+-- Guarda as contagens por usuário e prazo; as pendentes com prazo vencido são as atrasadas.
+-- Preencha com: flask --app app reconstruir-resumo
+CREATE TABLE IF NOT EXISTS resumo_solicitacao (
+    assigned_to_username VARCHAR(255) NOT NULL,
+    prazo DATE NOT NULL,
+    pendentes INT NOT NULL DEFAULT 0,
+    entregues_a_tempo INT NOT NULL DEFAULT 0,
+    entregues_com_atraso INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (assigned_to_username, prazo)
+);
+
+-- Cria a tabela de tarefas em segundo plano se ela não existir (ver jobs.py).
+-- As tarefas são gravadas na mesma transação que as origina e apagadas quando concluídas.
+CREATE TABLE IF NOT EXISTS tarefas (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    tipo VARCHAR(50) NOT NULL,
+    argumentos TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pendente',
+    tentativas INT NOT NULL DEFAULT 0,
+    erro TEXT,
+    executar_apos DATETIME NOT NULL,
+    criado_em DATETIME NOT NULL,
+    atualizado_em DATETIME NOT NULL,
+    INDEX ix_tarefas_status_executar_apos (status, executar_apos)
 );
\ No newline at end of file
@@ -0,0 +1,154 @@
+# --- Serviço de Hash de Senhas ---
+# O scrypt/pbkdf2 ocupa a CPU por dezenas de milissegundos a cada chamada.
+# Em vez de rodar nas threads do servidor WSGI, os hashes vão para um pool
+# fixo de processos, com uma fila limitada: quando ela enche, a requisição
+# recebe 503 na hora em vez de prender mais uma thread.
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class ServicoSobrecarregado(ServiceUnavailable):
+    """A fila do serviço de hash está cheia (respondido como 503)."""
+
+    description = "Servidor ocupado no momento. Tente novamente em instantes."
+
+    def __init__(self):
+        super().__init__(retry_after=1)
+
+
+def contexto_do_pool():
+    """Contexto de multiprocessing para o pool de hashes.
+
+    O pool nasce numa requisição, quando o processo já tem threads do
+    servidor WSGI e da fila de tarefas; um fork nessa hora pode deixar o
+    filho travado num lock herdado. Com 'forkserver' os processos saem de
+    um servidor limpo, que só pré-carrega o werkzeug (e não o __main__).
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    contexto = multiprocessing.get_context('forkserver')
+    contexto.set_forkserver_preload(['werkzeug.security'])
+    return contexto
+
+
+def metodo_do_hash(password_hash):
+    """Retorna o método e os parâmetros de um hash, ex.: 'scrypt:32768:8:1'."""
+    return password_hash.split('$', 1)[0]
+
+
+class ServicoHash:
+    """Gera e confere hashes de senha num pool de processos de tamanho fixo.
+
+    Lê da configuração do app:
+      HASH_METODO  -- método do werkzeug, ex.: 'scrypt:32768:8:1'
+      HASH_WORKERS -- processos do pool (0 roda na própria thread)
+      HASH_FILA    -- hashes que podem esperar além dos que estão rodando
+      HASH_TIMEOUT -- segundos máximos de espera por um resultado
+    O pool só é criado no primeiro uso, já dentro do processo do servidor,
+    e é recriado se um dos processos morrer (ex.: falta de memória).
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._executor = None
+        self._vagas = None
+        self._prefixo_atual = None
+        self._lock = threading.Lock()
+
+    def _iniciar(self):
+        with self._lock:
+            if self._vagas is None:
+                workers = self.config['HASH_WORKERS']
+                if workers > 0:
+                    self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=contexto_do_pool())
+                self._vagas = threading.BoundedSemaphore(max(workers, 1) + self.config['HASH_FILA'])
+
+    def _executar(self, funcao, *args, bloquear=False):
+        if self._vagas is None:
+            self._iniciar()
+        vagas, executor = self._vagas, self._executor
+        if not vagas.acquire(blocking=bloquear):
+            raise ServicoSobrecarregado()
+        if executor is None:
+            try:
+                return funcao(*args)
+            finally:
+                vagas.release()
+        try:
+            futuro = executor.submit(funcao, *args)
+        except BrokenProcessPool:
+            # Um processo morreu antes: descarta o pool e tenta num pool novo
+            vagas.release()
+            self._descartar(executor)
+            return self._executar(funcao, *args, bloquear=bloquear)
+
+        def liberar(futuro):
+            vagas.release()
+            if not futuro.cancelled() and isinstance(futuro.exception(), BrokenProcessPool):
+                self._descartar(executor)
+        futuro.add_done_callback(liberar)
+        return futuro
+
+    def _descartar(self, executor):
+        """Descarta um pool quebrado (um novo é criado no próximo uso)."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._vagas = None
+        executor.shutdown(wait=False)
+
+    def _resultado(self, futuro_ou_valor):
+        if not hasattr(futuro_ou_valor, 'result'):
+            return futuro_ou_valor
+        try:
+            return futuro_ou_valor.result(timeout=self.config['HASH_TIMEOUT'])
+        except (TimeoutError, BrokenProcessPool):
+            # Demora demais ou processo morto no meio do hash: responde 503
+            # como na fila cheia, em vez de um erro 500
+            raise ServicoSobrecarregado()
+
+    def gerar(self, senha):
+        """Gera o hash de uma senha com o método configurado."""
+        return self._resultado(self._executar(generate_password_hash, senha, self.config['HASH_METODO']))
+
+    def verificar(self, password_hash, senha):
+        """Confere uma senha contra o hash armazenado."""
+        return self._resultado(self._executar(check_password_hash, password_hash, senha))
+
+    def gerar_varios(self, senhas):
+        """Gera os hashes de um lote de senhas, na ordem recebida.
+
+        Em vez de recusar, espera por vagas na fila, mas mantém no máximo
+        HASH_WORKERS hashes em andamento para sobrar espaço aos logins.
+        """
+        em_andamento = max(self.config['HASH_WORKERS'], 1)
+        pendentes, hashes = [], []
+        for senha in senhas:
+            if len(pendentes) >= em_andamento:
+                hashes.append(self._resultado(pendentes.pop(0)))
+            pendentes.append(self._executar(generate_password_hash, senha,
+                                            self.config['HASH_METODO'], bloquear=True))
+        hashes.extend(self._resultado(p) for p in pendentes)
+        return hashes
+
+    def precisa_rehash(self, password_hash):
+        """Indica se o hash foi gerado com parâmetros diferentes dos configurados."""
+        metodo = self.config['HASH_METODO']
+        if self._prefixo_atual is None or self._prefixo_atual[0] != metodo:
+            # O werkzeug completa os parâmetros omitidos (ex.: 'scrypt'), então
+            # o prefixo de referência vem de um hash gerado com o método atual
+            self._prefixo_atual = (metodo, metodo_do_hash(generate_password_hash('', metodo)))
+        return metodo_do_hash(password_hash) != self._prefixo_atual[1]
+
+    def encerrar(self):
+        """Encerra o pool de processos (um novo é criado no próximo uso)."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = None
+            self._vagas = None
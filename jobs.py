@@ -0,0 +1,165 @@
+# --- Fila de Tarefas em Segundo Plano ---
+# Efeitos colaterais em arquivos (apagar blobs, gerar miniaturas, coletar
+# lixo) não devem rodar na thread da requisição nem antes do commit. As
+# tarefas são gravadas na tabela 'tarefas' na mesma transação da mudança
+# que as originou e executadas por um pequeno pool de threads depois do
+# commit. Como ficam no banco, sobrevivem a reinícios do servidor; com
+# vários processos, cada tarefa é reservada por um único worker.
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+
+class FilaTarefas:
+    """Fila de tarefas persistida em banco, executada por threads do próprio processo.
+
+    Configuração do app:
+      TAREFAS_ATIVAS          -- inicia as threads na primeira requisição
+      TAREFAS_WORKERS         -- quantidade de threads
+      TAREFAS_INTERVALO       -- segundos entre verificações da tabela
+      TAREFAS_MAX_TENTATIVAS  -- tentativas antes de marcar a tarefa como 'falhou'
+      TAREFAS_TEMPO_LIMITE    -- segundos até uma tarefa 'executando' ser considerada abandonada
+    """
+
+    def __init__(self, app=None, db=None, modelo=None):
+        self._tipos = {}
+        self._periodicas = []
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        if app is not None:
+            self.init_app(app, db, modelo)
+
+    def init_app(self, app, db, modelo):
+        self.app = app
+        self.db = db
+        self.modelo = modelo
+        app.config.setdefault('TAREFAS_ATIVAS', True)
+        app.config.setdefault('TAREFAS_WORKERS', 2)
+        app.config.setdefault('TAREFAS_INTERVALO', 5)
+        app.config.setdefault('TAREFAS_MAX_TENTATIVAS', 5)
+        app.config.setdefault('TAREFAS_TEMPO_LIMITE', 600)
+
+        app.before_request(self.iniciar)
+        # Só acorda as threads depois que a transação que criou a tarefa foi gravada
+        event.listen(db.session, 'after_commit', self._apos_commit)
+
+    def tarefa(self, tipo):
+        """Decorador que registra a função executada para um tipo de tarefa."""
+        def registrar(funcao):
+            self._tipos[tipo] = funcao
+            return funcao
+        return registrar
+
+    def periodica(self, intervalo_config):
+        """Decorador que executa a função a cada app.config[intervalo_config] segundos."""
+        def registrar(funcao):
+            self._periodicas.append([intervalo_config, funcao, time.monotonic()])
+            return funcao
+        return registrar
+
+    def enfileirar(self, tipo, **argumentos):
+        """Adiciona uma tarefa à sessão atual; ela só roda se a transação for confirmada."""
+        if tipo not in self._tipos:
+            raise KeyError(f"Tipo de tarefa desconhecido: {tipo}")
+        self.db.session.add(self.modelo(tipo=tipo, argumentos=json.dumps(argumentos)))
+        self.db.session.info['tarefas_novas'] = True
+
+    def _apos_commit(self, sessao):
+        if sessao.info.pop('tarefas_novas', False):
+            self._acordar.set()
+
+    # --- Execução ---
+    def iniciar(self):
+        """Inicia as threads de execução (uma única vez por processo)."""
+        if self._threads or not self.app.config['TAREFAS_ATIVAS']:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for numero in range(self.app.config['TAREFAS_WORKERS']):
+                thread = threading.Thread(target=self._laco, name=f'tarefas-{numero}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _laco(self):
+        while True:
+            self._acordar.wait(timeout=self.app.config['TAREFAS_INTERVALO'])
+            self._acordar.clear()
+            try:
+                with self.app.app_context():
+                    self._recuperar_abandonadas()
+                    self._executar_periodicas()
+                    while self.executar_proxima():
+                        pass
+            except Exception:
+                self.app.logger.exception("Erro na fila de tarefas")
+
+    def _executar_periodicas(self):
+        agora = time.monotonic()
+        with self._lock:
+            vencidas = [p for p in self._periodicas if agora >= p[2]]
+            for periodica in vencidas:
+                periodica[2] = agora + self.app.config[periodica[0]]
+        for _, funcao, _ in vencidas:
+            funcao()
+            self.db.session.remove()
+
+    def executar_proxima(self):
+        """Reserva e executa a próxima tarefa pendente. Retorna False se não havia nenhuma."""
+        db, Tarefa = self.db, self.modelo
+        agora = datetime.now()
+        tarefa_id = db.session.execute(
+            db.select(Tarefa.id)
+            .where(Tarefa.status == 'pendente', Tarefa.executar_apos <= agora)
+            .order_by(Tarefa.id).limit(1)
+        ).scalar()
+        if tarefa_id is None:
+            db.session.remove()
+            return False
+
+        # Só um worker (de qualquer processo) consegue mudar o status de 'pendente'
+        reservada = db.session.execute(
+            db.update(Tarefa)
+            .where(Tarefa.id == tarefa_id, Tarefa.status == 'pendente')
+            .values(status='executando', tentativas=Tarefa.tentativas + 1, atualizado_em=agora)
+        ).rowcount == 1
+        db.session.commit()
+        if not reservada:
+            return True
+
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        try:
+            self._tipos[tarefa.tipo](**json.loads(tarefa.argumentos))
+        except Exception as e:
+            db.session.rollback()
+            tarefa = db.session.get(Tarefa, tarefa_id)
+            tarefa.erro = repr(e)
+            if tarefa.tentativas >= self.app.config['TAREFAS_MAX_TENTATIVAS']:
+                tarefa.status = 'falhou'
+                self.app.logger.error("Tarefa %s (%s) falhou: %r", tarefa.id, tarefa.tipo, e)
+            else:
+                # Nova tentativa mais tarde, com espera crescente
+                tarefa.status = 'pendente'
+                tarefa.executar_apos = datetime.now() + timedelta(seconds=30 * tarefa.tentativas)
+        else:
+            db.session.delete(tarefa)
+        db.session.commit()
+        db.session.remove()
+        return True
+
+    def _recuperar_abandonadas(self):
+        """Devolve à fila tarefas que ficaram 'executando' (ex.: o processo morreu)."""
+        Tarefa = self.modelo
+        agora = datetime.now()
+        limite = agora - timedelta(seconds=self.app.config['TAREFAS_TEMPO_LIMITE'])
+        self.db.session.execute(
+            self.db.update(Tarefa)
+            .where(Tarefa.status == 'executando', Tarefa.atualizado_em < limite)
+            .values(status='pendente', atualizado_em=agora)
+        )
+        self.db.session.commit()
+        self.db.session.remove()
@@ -0,0 +1,176 @@
+# --- Instrumentação de Requisições e Consultas ---
+# Mede, por requisição, o tempo gasto no banco (e quantas consultas), na
+# renderização dos templates e no total. O resultado vai no cabeçalho
+# Server-Timing (visível no DevTools do navegador) e em /metrics, no
+# formato texto do Prometheus. Os números são do processo atual: com vários
+# workers do Gunicorn, cada um expõe os seus.
+import bisect
+import hmac
+import threading
+import time
+
+from flask import abort, current_app, g, has_request_context, request, session
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+# Limites (em segundos) dos baldes do histograma de latência
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Instrumentacao:
+    """Coleta tempos de banco, renderização e total por endpoint.
+
+    Configuração do app:
+      METRICAS_LIMITE_CONSULTAS -- acima disso, registra um aviso de possível N+1
+      METRICAS_TOKEN            -- token aceito em /metrics ('Authorization: Bearer <token>');
+                                   sem ele, só uma sessão de administrador vê as métricas
+    """
+
+    def __init__(self, app=None, db=None):
+        self.db = db
+        self.buckets = BUCKETS_PADRAO
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+        app.config.setdefault('METRICAS_LIMITE_CONSULTAS', 20)
+        app.config.setdefault('METRICAS_TOKEN', None)
+
+        app.before_request(self._inicio_requisicao)
+        app.after_request(self._fim_requisicao)
+        before_render_template.connect(self._inicio_render, app)
+        template_rendered.connect(self._fim_render, app)
+
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._inicio_consulta)
+            event.listen(db.engine, 'after_cursor_execute', self._fim_consulta)
+            # Consultas com erro não chegam ao after_cursor_execute
+            event.listen(db.engine, 'handle_error', self._erro_consulta)
+
+        app.add_url_rule('/metrics', 'metrics', self.exportar)
+
+    # --- Coleta ---
+    def _inicio_requisicao(self):
+        g.metricas = {'inicio': time.perf_counter(), 'db': 0.0, 'consultas': 0, 'render': 0.0}
+
+    def _inicio_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    def _fim_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        self._encerrar_consulta(conn)
+
+    def _erro_consulta(self, contexto):
+        # Sem isso, a pilha de inícios cresceria nas conexões reaproveitadas do pool
+        if contexto.connection is not None and contexto.connection.info.get('metricas_inicio'):
+            self._encerrar_consulta(contexto.connection)
+
+    def _encerrar_consulta(self, conn):
+        inicio = conn.info['metricas_inicio'].pop()
+        if has_request_context() and 'metricas' in g:
+            g.metricas['db'] += time.perf_counter() - inicio
+            g.metricas['consultas'] += 1
+
+    def _inicio_render(self, app, template, context, **extra):
+        if 'metricas' in g:
+            g.metricas['render_inicio'] = time.perf_counter()
+
+    def _fim_render(self, app, template, context, **extra):
+        if 'metricas' in g and 'render_inicio' in g.metricas:
+            g.metricas['render'] += time.perf_counter() - g.metricas.pop('render_inicio')
+
+    def _fim_requisicao(self, response):
+        metricas = g.pop('metricas', None)
+        if metricas is None:
+            return response
+        total = time.perf_counter() - metricas['inicio']
+        endpoint = request.endpoint or 'desconhecido'
+
+        limite = current_app.config['METRICAS_LIMITE_CONSULTAS']
+        suspeita_n1 = metricas['consultas'] > limite
+        if suspeita_n1:
+            current_app.logger.warning(
+                "%s executou %d consultas (limite %d): possível N+1",
+                endpoint, metricas['consultas'], limite,
+            )
+
+        self._registrar(endpoint, total, metricas, suspeita_n1)
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={metricas["db"] * 1000:.1f};desc="{metricas["consultas"]} consultas", '
+            f'render;dur={metricas["render"] * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}',
+        )
+        return response
+
+    def _registrar(self, endpoint, total, metricas, suspeita_n1):
+        with self._lock:
+            dados = self._endpoints.get(endpoint)
+            if dados is None:
+                dados = self._endpoints[endpoint] = {
+                    'baldes': [0] * len(self.buckets), 'contagem': 0, 'soma': 0.0,
+                    'db': 0.0, 'consultas': 0, 'render': 0.0, 'n1': 0,
+                }
+            indice = bisect.bisect_left(self.buckets, total)
+            if indice < len(self.buckets):
+                dados['baldes'][indice] += 1
+            dados['contagem'] += 1
+            dados['soma'] += total
+            dados['db'] += metricas['db']
+            dados['consultas'] += metricas['consultas']
+            dados['render'] += metricas['render']
+            dados['n1'] += suspeita_n1
+
+    # --- Exportação ---
+    def exportar(self):
+        token = current_app.config['METRICAS_TOKEN']
+        com_token = bool(token) and hmac.compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {token}')
+        if not com_token and session.get('role') != 'admin':
+            abort(401)
+
+        with self._lock:
+            endpoints = {nome: dict(dados, baldes=list(dados['baldes']))
+                         for nome, dados in sorted(self._endpoints.items())}
+
+        linhas = [
+            '# HELP gsme_request_duration_seconds Latência das requisições por endpoint.',
+            '# TYPE gsme_request_duration_seconds histogram',
+        ]
+        for nome, dados in endpoints.items():
+            acumulado = 0
+            for limite, quantidade in zip(self.buckets, dados['baldes']):
+                acumulado += quantidade
+                linhas.append(f'gsme_request_duration_seconds_bucket{{endpoint="{nome}",le="{limite}"}} {acumulado}')
+            linhas.append(f'gsme_request_duration_seconds_bucket{{endpoint="{nome}",le="+Inf"}} {dados["contagem"]}')
+            linhas.append(f'gsme_request_duration_seconds_sum{{endpoint="{nome}"}} {dados["soma"]:.6f}')
+            linhas.append(f'gsme_request_duration_seconds_count{{endpoint="{nome}"}} {dados["contagem"]}')
+
+        contadores = (
+            ('gsme_db_queries_total', 'Consultas SQL executadas por endpoint.', 'consultas', '{}'),
+            ('gsme_db_duration_seconds_total', 'Tempo gasto no banco por endpoint.', 'db', '{:.6f}'),
+            ('gsme_render_duration_seconds_total', 'Tempo gasto renderizando templates por endpoint.', 'render', '{:.6f}'),
+            ('gsme_n_plus_one_warnings_total', 'Requisições acima do limite de consultas.', 'n1', '{}'),
+        )
+        for metrica, descricao, chave, formato in contadores:
+            linhas.append(f'# HELP {metrica} {descricao}')
+            linhas.append(f'# TYPE {metrica} counter')
+            for nome, dados in endpoints.items():
+                linhas.append(f'{metrica}{{endpoint="{nome}"}} {formato.format(dados[chave])}')
+
+        # Pool de conexões (QueuePool); outros pools não expõem esses números
+        pool = self.db.engine.pool
+        gauges = (
+            ('gsme_db_pool_size', 'Conexões permanentes do pool.', 'size'),
+            ('gsme_db_pool_checked_out', 'Conexões do pool em uso.', 'checkedout'),
+            ('gsme_db_pool_overflow', 'Conexões abertas além do tamanho do pool.', 'overflow'),
+        )
+        for metrica, descricao, metodo in gauges:
+            if hasattr(pool, metodo):
+                linhas.append(f'# HELP {metrica} {descricao}')
+                linhas.append(f'# TYPE {metrica} gauge')
+                linhas.append(f'{metrica} {getattr(pool, metodo)()}')
+
+        return '\n'.join(linhas) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,137 @@
+# --- Arquivos Estáticos com Impressão Digital ---
+# Na inicialização, cada arquivo de static/ recebe um nome com o hash do seu
+# conteúdo (ex.: style.3f2a1b9c0d4e.css), usado automaticamente por
+# url_for('static', ...). Como o nome muda quando o conteúdo muda, esses
+# arquivos podem ficar em cache "para sempre" (Cache-Control: immutable).
+# Versões gzip e brotli (se o pacote 'brotli' estiver instalado) são geradas
+# uma vez e escolhidas conforme o Accept-Encoding do navegador.
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import request, send_file, send_from_directory
+from jinja2 import FileSystemBytecodeCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipos que valem a pena comprimir (imagens PNG/JPG já são comprimidas)
+TIPOS_COMPRIMIVEIS = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+def nome_com_hash(filename, digest):
+    """Insere o hash antes da extensão: 'img/1.png' -> 'img/1.<hash>.png'."""
+    base, extensao = os.path.splitext(filename)
+    return f"{base}.{digest}{extensao}"
+
+
+def comprimivel(filename):
+    tipo = mimetypes.guess_type(filename)[0] or ''
+    return tipo.startswith(TIPOS_COMPRIMIVEIS)
+
+
+def gravar_atomicamente(caminho, dados):
+    """Grava o arquivo via temporário + rename, seguro com vários workers."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+
+class ArquivosEstaticos:
+    """Serve static/ com nomes versionados, pré-compressão e cache de longa duração.
+
+    Configuração do app:
+      STATIC_FINGERPRINT    -- ativa os nomes com hash em url_for('static')
+      STATIC_BUILD_FOLDER   -- onde ficam as versões .gz/.br geradas
+      STATIC_CACHE_MAX_AGE  -- max-age (segundos) dos arquivos com hash
+      JINJA_CACHE_FOLDER    -- cache de bytecode dos templates (None desativa)
+    """
+
+    def __init__(self, app=None):
+        self.manifesto = {}
+        self.originais = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        build = os.path.join(app.root_path, 'build')
+        app.config.setdefault('STATIC_FINGERPRINT', True)
+        app.config.setdefault('STATIC_BUILD_FOLDER', os.path.join(build, 'static'))
+        app.config.setdefault('STATIC_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+        app.config.setdefault('JINJA_CACHE_FOLDER', os.path.join(build, 'jinja'))
+
+        # Templates compilados ficam em disco: um worker novo do Gunicorn
+        # carrega o bytecode em vez de compilar admin.html do zero
+        if app.config['JINJA_CACHE_FOLDER']:
+            os.makedirs(app.config['JINJA_CACHE_FOLDER'], exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_CACHE_FOLDER'])
+
+        if app.config['STATIC_FINGERPRINT']:
+            self.construir()
+            app.url_defaults(self._url_defaults)
+            app.view_functions['static'] = self.servir
+
+    def construir(self):
+        """Calcula o hash de cada arquivo estático e gera as versões comprimidas."""
+        pasta = self.app.static_folder
+        build = self.app.config['STATIC_BUILD_FOLDER']
+        manifesto, originais = {}, {}
+
+        for raiz, _, arquivos in os.walk(pasta):
+            for nome in arquivos:
+                caminho = os.path.join(raiz, nome)
+                filename = os.path.relpath(caminho, pasta).replace(os.sep, '/')
+                with open(caminho, 'rb') as f:
+                    conteudo = f.read()
+                versionado = nome_com_hash(filename, hashlib.sha256(conteudo).hexdigest()[:12])
+                manifesto[filename] = versionado
+                originais[versionado] = filename
+
+                if not comprimivel(filename):
+                    continue
+                destino = os.path.join(build, versionado)
+                if not os.path.exists(destino + '.gz'):
+                    gravar_atomicamente(destino + '.gz', gzip.compress(conteudo, compresslevel=9, mtime=0))
+                if brotli is not None and not os.path.exists(destino + '.br'):
+                    gravar_atomicamente(destino + '.br', brotli.compress(conteudo))
+
+        self.manifesto, self.originais = manifesto, originais
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifesto.get(values['filename'], values['filename'])
+
+    def servir(self, filename):
+        """Substitui a rota 'static' do Flask."""
+        original = self.originais.get(filename)
+        if original is None:
+            # Nome sem hash (ex.: links antigos): comportamento padrão do Flask
+            return send_from_directory(self.app.static_folder, filename)
+
+        response = None
+        if comprimivel(original):
+            build = self.app.config['STATIC_BUILD_FOLDER']
+            aceitas = request.accept_encodings
+            for codificacao, extensao in (('br', '.br'), ('gzip', '.gz')):
+                variante = os.path.join(build, filename + extensao)
+                if aceitas[codificacao] and os.path.isfile(variante):
+                    response = send_file(variante, mimetype=mimetypes.guess_type(original)[0])
+                    response.content_encoding = codificacao
+                    break
+            if response is None:
+                response = send_from_directory(self.app.static_folder, original)
+            response.vary.add('Accept-Encoding')
+        else:
+            response = send_from_directory(self.app.static_folder, original)
+
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = self.app.config['STATIC_CACHE_MAX_AGE']
+        response.cache_control.immutable = True
+        return response
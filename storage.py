@@ -0,0 +1,139 @@
+# --- Armazenamento de Arquivos Enviados ---
+# Cada arquivo é gravado uma única vez, com o nome igual ao SHA-256 do seu
+# conteúdo. Envios repetidos do mesmo arquivo apontam para o mesmo blob; a
+# contagem de referências fica no banco (tabela 'arquivos', em app.py).
+# Nos uploads, BlobEmGravacao é o destino do próprio parser multipart: os
+# bytes são gravados e o hash calculado enquanto o corpo é lido, sem uma
+# cópia intermediária em memória ou em arquivo temporário do Werkzeug.
+import hashlib
+import os
+import re
+import tempfile
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Tamanho dos blocos lidos do upload (64 KiB)
+TAMANHO_BLOCO = 64 * 1024
+
+# Pasta (dentro da pasta de uploads) para arquivos ainda em gravação
+PASTA_TEMPORARIA = '.tmp'
+
+# Nome de um blob: 64 dígitos hexadecimais e, opcionalmente, a extensão
+PADRAO_BLOB = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]{1,10})?$')
+
+
+class ArquivoMuitoGrande(RequestEntityTooLarge):
+    """O arquivo enviado ultrapassou o tamanho máximo permitido (respondido como 413)."""
+
+    def __init__(self, limite_bytes):
+        super().__init__(f"Arquivo maior que o limite de {limite_bytes} bytes.")
+        self.limite_bytes = limite_bytes
+
+
+def extensao_segura(filename):
+    """Retorna a extensão do arquivo em minúsculas, ou '' se for inválida."""
+    extensao = os.path.splitext(filename or '')[1].lower()
+    return extensao if re.fullmatch(r'\.[a-z0-9]{1,10}', extensao) else ''
+
+
+def sha256_do_blob(filename):
+    """Retorna o SHA-256 contido no nome de um blob, ou None para outros arquivos."""
+    encontrado = PADRAO_BLOB.match(filename)
+    return encontrado.group(1) if encontrado else None
+
+
+class BlobEmGravacao:
+    """Arquivo em <pasta>/.tmp que calcula o SHA-256 enquanto recebe os bytes.
+
+    Serve de stream_factory para o parser multipart (ver app.py). Se
+    'limite_bytes' for ultrapassado, o temporário é apagado e
+    ArquivoMuitoGrande é lançada durante a própria leitura do corpo.
+    salvar() move o temporário para o nome definitivo; se ele nunca for
+    chamado, close() (feito pelo Flask ao fim da requisição) o descarta.
+    """
+
+    def __init__(self, pasta, limite_bytes=None):
+        pasta_tmp = os.path.join(pasta, PASTA_TEMPORARIA)
+        os.makedirs(pasta_tmp, exist_ok=True)
+        fd, self.caminho_tmp = tempfile.mkstemp(dir=pasta_tmp)
+        self._arquivo = os.fdopen(fd, 'w+b')
+        self._sha256 = hashlib.sha256()
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        self.tamanho = 0
+
+    def write(self, dados):
+        self.tamanho += len(dados)
+        if self.limite_bytes is not None and self.tamanho > self.limite_bytes:
+            self.close()
+            raise ArquivoMuitoGrande(self.limite_bytes)
+        self._sha256.update(dados)
+        return self._arquivo.write(dados)
+
+    def __getattr__(self, nome):
+        # seek, read, tell etc. (usados pelo Werkzeug e pelo FileStorage)
+        return getattr(self._arquivo, nome)
+
+    def salvar(self, extensao=''):
+        """Grava o blob com o nome definitivo. Retorna (sha256, caminho, tamanho)."""
+        self._arquivo.close()
+        digest = self._sha256.hexdigest()
+        caminho = os.path.join(self.pasta, f"{digest}{extensao}")
+        try:
+            # Conteúdo já armazenado: não grava os mesmos bytes duas vezes, mas
+            # renova a data de modificação para o coletor de órfãos (que poupa
+            # blobs recentes) não apagá-lo antes do commit desta referência
+            os.utime(caminho)
+        except FileNotFoundError:
+            os.replace(self.caminho_tmp, caminho)
+        else:
+            os.remove(self.caminho_tmp)
+        self.caminho_tmp = None
+        return digest, caminho, self.tamanho
+
+    def close(self):
+        """Fecha e, se salvar() não foi chamado, apaga o temporário."""
+        self._arquivo.close()
+        if self.caminho_tmp is not None:
+            remover_blob(self.caminho_tmp)
+            self.caminho_tmp = None
+
+
+def salvar_blob(stream, pasta, extensao='', limite_bytes=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Grava o conteúdo de 'stream' na pasta, endereçado pelo seu SHA-256.
+
+    Para streams que não vêm de um upload (ex.: scripts e testes): o stream
+    é lido em blocos de tamanho fixo e passado a um BlobEmGravacao.
+    Retorna (sha256, caminho, tamanho).
+    """
+    blob = BlobEmGravacao(pasta, limite_bytes)
+    try:
+        while True:
+            bloco = stream.read(tamanho_bloco)
+            if not bloco:
+                break
+            blob.write(bloco)
+        return blob.salvar(extensao)
+    finally:
+        blob.close()
+
+
+def nome_do_arquivo(caminho):
+    """Nome do arquivo em um caminho salvo no banco, aceitando '/' ou '\\'."""
+    return caminho.replace('\\', '/').rsplit('/', 1)[-1]
+
+
+def modificado_depois(caminho, limite):
+    """Indica se o arquivo foi modificado depois de 'limite' (timestamp)."""
+    try:
+        return os.stat(caminho).st_mtime >= limite
+    except FileNotFoundError:
+        return False
+
+
+def remover_blob(caminho):
+    """Remove um blob do disco, ignorando arquivos que já não existem."""
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Os testes usam um SQLite em memória, nunca o banco configurado em app.py
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+
+from app import app as flask_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    config_original = dict(flask_app.config)
+    flask_app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path), TAREFAS_ATIVAS=False)
+    yield flask_app
+    flask_app.config.clear()
+    flask_app.config.update(config_original)
+
+
+@pytest.fixture
+def banco(app):
+    with app.app_context():
+        db.create_all()
+    yield db
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def logged_client(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['username'] = 'subordinado1'
+        sess['role'] = 'subordinado'
+    return client
+
+
+@pytest.fixture
+def admin_client(client):
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    return client
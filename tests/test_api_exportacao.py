@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+
+from app import CAMPOS_SOLICITACAO, Solicitacao
+
+
+@pytest.fixture
+def solicitacoes(app, banco):
+    app.config['MINIATURAS_ATIVAS'] = False
+    with app.app_context():
+        novas = [
+            Solicitacao(descricao='Relatório A', prazo=date(2030, 1, 1), assigned_to_username='subordinado1'),
+            Solicitacao(descricao='Relatório B', prazo=date(2030, 1, 2), assigned_to_username='subordinado1',
+                        arquivo_path='/srv/gsme/uploads/abc.pdf', status='Entregue',
+                        data_entrega=date(2030, 1, 1)),
+            Solicitacao(descricao='Relatório C', prazo=date(2030, 1, 2), assigned_to_username='subordinado1'),
+            Solicitacao(descricao='Relatório D', prazo=date(2030, 1, 3), assigned_to_username='subordinado1'),
+            Solicitacao(descricao='Relatório E', prazo=date(2030, 1, 1), assigned_to_username='subordinado2'),
+        ]
+        banco.session.add_all(novas)
+        banco.session.commit()
+        return [s.id for s in novas]
+
+
+def pagina(client, **params):
+    response = client.get('/api/solicitacoes', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def ids(dados):
+    return [s['id'] for s in dados['solicitacoes']]
+
+
+def test_api_percorre_as_paginas_nos_dois_sentidos(admin_client, solicitacoes):
+    a, b, c, d, e = solicitacoes
+    primeira = pagina(admin_client, por_pagina=2)
+    assert ids(primeira) == [a, e]
+    assert primeira['anterior'] is None and primeira['cursor_anterior'] is None
+
+    segunda = pagina(admin_client, por_pagina=2, depois=primeira['cursor_proximo'])
+    assert ids(segunda) == [b, c]
+
+    ultima = pagina(admin_client, por_pagina=2, depois=segunda['cursor_proximo'])
+    assert ids(ultima) == [d]
+    assert ultima['proximo'] is None and ultima['cursor_proximo'] is None
+
+    # Voltando pelo cursor 'antes' chega-se às mesmas páginas
+    assert ids(pagina(admin_client, por_pagina=2, antes=ultima['cursor_anterior'])) == [b, c]
+    volta = pagina(admin_client, por_pagina=2, antes=segunda['cursor_anterior'])
+    assert ids(volta) == [a, e]
+    assert volta['cursor_anterior'] is None
+
+
+def test_api_pagina_vazia(admin_client, solicitacoes):
+    dados = pagina(admin_client, depois='2031-01-01_1')
+    assert dados['solicitacoes'] == []
+    assert dados['proximo'] is None and dados['anterior'] is None
+
+
+def test_api_subordinado_ve_so_as_proprias(logged_client, solicitacoes):
+    dados = pagina(logged_client, subordinate='subordinado2')
+    assert ids(dados) == solicitacoes[:4]
+    assert {s['assigned_to_username'] for s in dados['solicitacoes']} == {'subordinado1'}
+
+
+def test_api_nao_expoe_o_caminho_no_disco(admin_client, solicitacoes):
+    dados = pagina(admin_client)
+    assert all(set(s) == set(CAMPOS_SOLICITACAO) for s in dados['solicitacoes'])
+    entregue = next(s for s in dados['solicitacoes'] if s['id'] == solicitacoes[1])
+    assert entregue['download_link'].endswith('/uploads/abc.pdf')
+    assert '/srv/gsme' not in json.dumps(dados)
+
+
+def test_exportacao_csv(admin_client, solicitacoes):
+    response = admin_client.get('/admin/export.csv', query_string={'subordinate': 'subordinado1'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    linhas = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+    assert [int(linha['id']) for linha in linhas] == solicitacoes[:4]
+    assert list(linhas[0]) == CAMPOS_SOLICITACAO
+    entregue = linhas[1]
+    assert (entregue['descricao'], entregue['prazo'], entregue['data_entrega']) == (
+        'Relatório B', '2030-01-02', '2030-01-01')
+    assert entregue['download_link'].endswith('/uploads/abc.pdf')
+    assert linhas[0]['data_entrega'] == '' and linhas[0]['download_link'] == ''
+
+
+def test_exportacao_ndjson(admin_client, solicitacoes):
+    response = admin_client.get('/admin/export.ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    linhas = [json.loads(linha) for linha in response.get_data(as_text=True).splitlines()]
+
+    a, b, c, d, e = solicitacoes
+    assert [linha['id'] for linha in linhas] == [a, e, b, c, d]
+    assert all(list(linha) == CAMPOS_SOLICITACAO for linha in linhas)
+    assert linhas[2]['descricao'] == 'Relatório B'
+    assert linhas[2]['download_link'].endswith('/uploads/abc.pdf')
+    assert linhas[0]['data_entrega'] is None
@@ -0,0 +1,181 @@
+import hashlib
+import io
+import os
+import time
+from datetime import date
+
+import pytest
+
+import storage
+from app import Arquivo, Solicitacao, Tarefa, coletar_orfaos, fila_tarefas
+
+CONTEUDO = b'%PDF-1.4 ' + bytes(range(256)) * 4
+BLOB = f'{hashlib.sha256(CONTEUDO).hexdigest()}.pdf'
+
+
+def criar_arquivo(pasta, nome, conteudo=CONTEUDO, idade=2 * 60 * 60):
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+    antigo = time.time() - idade
+    os.utime(caminho, (antigo, antigo))
+    return caminho
+
+
+def criar_solicitacao(db, arquivo_path=None):
+    solicitacao = Solicitacao(descricao='Relatório', prazo=date(2030, 1, 1),
+                              assigned_to_username='subordinado1', arquivo_path=arquivo_path)
+    db.session.add(solicitacao)
+    db.session.commit()
+    return solicitacao.id
+
+
+@pytest.fixture
+def pasta(app, banco):
+    app.config['MINIATURAS_ATIVAS'] = False
+    return app.config['UPLOAD_FOLDER']
+
+
+def test_coleta_apaga_apenas_orfaos_antigos(app, pasta, banco):
+    orfao = criar_arquivo(pasta, 'b' * 64 + '.pdf', b'orfao')
+    recente = criar_arquivo(pasta, 'c' * 64 + '.pdf', b'recente', idade=0)
+    referenciado = criar_arquivo(pasta, BLOB)
+    with app.app_context():
+        criar_solicitacao(banco, os.path.join(pasta, BLOB))
+        banco.session.add(Arquivo(caminho=orfao, sha256='b' * 64, tamanho=5, referencias=1))
+        banco.session.commit()
+
+        assert coletar_orfaos() == len(b'orfao')
+        assert banco.session.get(Arquivo, orfao) is None
+
+    assert not os.path.exists(orfao)
+    assert os.path.exists(recente)
+    assert os.path.exists(referenciado)
+
+
+@pytest.mark.parametrize('arquivo_path', [
+    f'uploads\\{BLOB}',
+    f'/srv/gsme/uploads/{BLOB}',
+    BLOB,
+])
+def test_coleta_compara_pelo_nome_do_arquivo(app, pasta, banco, arquivo_path):
+    referenciado = criar_arquivo(pasta, BLOB)
+    with app.app_context():
+        criar_solicitacao(banco, arquivo_path)
+        assert coletar_orfaos() == 0
+    assert os.path.exists(referenciado)
+
+
+def test_coleta_poupa_blob_reaproveitado_antes_do_commit(app, pasta, banco):
+    blob = criar_arquivo(pasta, BLOB)
+    # Envio do mesmo conteúdo: o blob já existe e a referência ainda não foi gravada
+    _, caminho, _ = storage.salvar_blob(io.BytesIO(CONTEUDO), pasta, '.pdf')
+    assert caminho == blob
+    with app.app_context():
+        assert coletar_orfaos() == 0
+    assert os.path.exists(blob)
+
+
+def test_reenvio_mantem_o_blob(app, pasta, banco, logged_client):
+    with app.app_context():
+        id = criar_solicitacao(banco)
+    blob = criar_arquivo(pasta, BLOB)
+
+    response = logged_client.post(f'/upload_arquivo/{id}', data={'arquivo': (io.BytesIO(CONTEUDO), 'relatorio.pdf')})
+    assert response.status_code == 302
+
+    with app.app_context():
+        assert banco.session.get(Solicitacao, id).arquivo_path == blob
+        assert banco.session.get(Arquivo, blob).referencias == 1
+        assert coletar_orfaos() == 0
+    assert os.path.exists(blob)
+
+
+def enviar(client, id, conteudo=CONTEUDO):
+    with client.session_transaction() as sess:
+        sess.update(logged_in=True, username='subordinado1', role='subordinado')
+    client.post(f'/upload_arquivo/{id}', data={'arquivo': (io.BytesIO(conteudo), 'relatorio.pdf')})
+
+
+def deletar(client, id):
+    with client.session_transaction() as sess:
+        sess.update(logged_in=True, username='admin', role='admin')
+    client.get(f'/deletar_solicitacao/{id}')
+
+
+def envelhecer(caminho):
+    antigo = time.time() - 2 * 60 * 60
+    os.utime(caminho, (antigo, antigo))
+
+
+def test_tarefa_remove_blob_sem_referencias(app, pasta, banco, client):
+    with app.app_context():
+        id = criar_solicitacao(banco)
+    enviar(client, id)
+    blob = os.path.join(pasta, BLOB)
+    envelhecer(blob)
+
+    deletar(client, id)
+    with app.app_context():
+        assert banco.session.get(Arquivo, blob) is None
+        assert fila_tarefas.executar_proxima()
+        assert banco.session.query(Tarefa).count() == 0
+    assert not os.path.exists(blob)
+
+
+def test_tarefa_mantem_blob_ainda_referenciado(app, pasta, banco, client):
+    with app.app_context():
+        primeira, segunda = criar_solicitacao(banco), criar_solicitacao(banco)
+    enviar(client, primeira)
+    enviar(client, segunda)
+    blob = os.path.join(pasta, BLOB)
+    envelhecer(blob)
+
+    deletar(client, primeira)
+    with app.app_context():
+        assert banco.session.get(Arquivo, blob).referencias == 1
+        assert banco.session.query(Tarefa).count() == 0
+    assert os.path.exists(blob)
+
+
+def test_tarefa_poupa_blob_reaproveitado_antes_do_commit(app, pasta, banco, client):
+    with app.app_context():
+        id = criar_solicitacao(banco)
+    enviar(client, id)
+    blob = os.path.join(pasta, BLOB)
+    envelhecer(blob)
+    deletar(client, id)
+
+    # Outro envio do mesmo conteúdo, ainda sem commit, reaproveita o blob
+    storage.salvar_blob(io.BytesIO(CONTEUDO), pasta, '.pdf')
+    with app.app_context():
+        assert fila_tarefas.executar_proxima()
+    assert os.path.exists(blob)
+
+
+def test_coleta_em_lotes_com_varias_pastas_salvas(app, pasta, banco):
+    app.config['GC_LOTE'] = 2
+    nomes = [n * 64 + '.pdf' for n in 'abcdef']
+    for nome in nomes:
+        criar_arquivo(pasta, nome, b'x')
+    with app.app_context():
+        criar_solicitacao(banco, os.path.join(pasta, nomes[0]))
+        criar_solicitacao(banco, f'uploads\\{nomes[2]}')
+        criar_solicitacao(banco, f'/srv/gsme/uploads/{nomes[4]}')
+
+        assert coletar_orfaos() == 3
+
+    assert sorted(n for n in os.listdir(pasta) if n.endswith('.pdf')) == [nomes[0], nomes[2], nomes[4]]
+
+
+def test_painel_mostra_a_miniatura_existente(app, pasta, banco, admin_client):
+    criar_arquivo(pasta, BLOB)
+    os.makedirs(os.path.join(pasta, 'miniaturas'))
+    criar_arquivo(os.path.join(pasta, 'miniaturas'), BLOB.replace('.pdf', '.png'), b'png')
+    with app.app_context():
+        criar_solicitacao(banco, os.path.join(pasta, BLOB))
+        criar_solicitacao(banco, os.path.join(pasta, 'b' * 64 + '.pdf'))
+
+    html = admin_client.get('/admin/dashboard').get_data(as_text=True)
+    assert html.count('/miniaturas/') == 1
+    assert f'/miniaturas/{BLOB.replace(".pdf", ".png")}' in html
@@ -0,0 +1,38 @@
+import os
+import time
+
+import pytest
+
+from hashing import ServicoHash, ServicoSobrecarregado
+
+
+@pytest.fixture
+def servico():
+    servico = ServicoHash({'HASH_METODO': 'pbkdf2:sha256:1000', 'HASH_WORKERS': 1,
+                           'HASH_FILA': 2, 'HASH_TIMEOUT': 10})
+    yield servico
+    servico.encerrar()
+
+
+def test_gera_e_verifica(servico):
+    assert servico.verificar(servico.gerar('segredo'), 'segredo')
+
+
+def test_recria_pool_depois_que_um_processo_morre(servico):
+    servico.gerar('aquece o pool')
+    with pytest.raises(ServicoSobrecarregado):
+        servico._resultado(servico._executar(os._exit, 1))
+    # Os próximos logins usam um pool novo em vez de falhar para sempre
+    assert servico.verificar(servico.gerar('segredo'), 'segredo')
+
+
+def test_tempo_esgotado_vira_503(servico):
+    servico.config['HASH_TIMEOUT'] = 0.05
+    with pytest.raises(ServicoSobrecarregado):
+        servico._resultado(servico._executar(time.sleep, 1))
+
+
+def test_pool_nao_usa_fork(servico):
+    servico.gerar('aquece o pool')
+    # Forks de um processo com várias threads podem travar os filhos
+    assert servico._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
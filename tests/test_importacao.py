@@ -0,0 +1,115 @@
+import io
+import json
+
+import pytest
+
+import app as gsme
+from app import ResumoSolicitacao, Solicitacao, Usuario, reconstruir_resumo
+
+
+@pytest.fixture
+def importacao(app, banco):
+    # Hash rápido e no próprio processo; lotes pequenos para exercitar vários INSERTs
+    app.config.update(HASH_METODO='pbkdf2:sha256:1000', HASH_WORKERS=0, IMPORTACAO_TAMANHO_LOTE=2,
+                      RESUMO_INCREMENTAL=True, MINIATURAS_ATIVAS=False)
+    with app.app_context():
+        banco.session.add_all([
+            Usuario(username='subordinado1', password_hash='x', role='subordinado'),
+            Usuario(username='subordinado2', password_hash='x', role='subordinado'),
+            Usuario(username='chefe', password_hash='x', role='admin'),
+        ])
+        banco.session.commit()
+
+
+def enviar_arquivo(client, tipo, nome, conteudo):
+    return client.post('/admin/importar', data={
+        'tipo': tipo, 'arquivo': (io.BytesIO(conteudo.encode('utf-8')), nome),
+    })
+
+
+def nomes(banco):
+    return sorted(banco.session.execute(banco.select(Usuario.username)).scalars())
+
+
+def test_importa_usuarios_por_json(app, banco, importacao, admin_client):
+    response = admin_client.post('/admin/importar', json={'tipo': 'usuarios', 'linhas': [
+        {'username': 'ana', 'password': 'segredo'},
+        {'username': 'subordinado1', 'password': 'segredo'},
+        {'username': 'bia', 'password': 'segredo'},
+        {'username': 'ana', 'password': 'outra'},
+        {'username': 'caio'},
+    ]})
+    relatorio = response.get_json()
+
+    assert (relatorio['total'], relatorio['inseridos']) == (5, 2)
+    assert [(erro['linha'], erro['erro']) for erro in relatorio['erros']] == [
+        (2, "Usuário 'subordinado1' já existe."),
+        (4, "Usuário 'ana' repetido no arquivo."),
+        (5, "Senha ausente."),
+    ]
+    with app.app_context():
+        assert nomes(banco) == ['ana', 'bia', 'chefe', 'subordinado1', 'subordinado2']
+        ana = banco.session.execute(banco.select(Usuario).filter_by(username='ana')).scalar_one()
+        assert ana.role == 'subordinado'
+        assert gsme.servico_hash.verificar(ana.password_hash, 'segredo')
+
+
+def test_csv_informa_a_linha_do_arquivo(app, banco, importacao, admin_client):
+    conteudo = ('descricao,prazo,assigned_to_username\n'
+                'Relatório,2030-01-01,subordinado1\n'
+                'Sem prazo,,subordinado1\n'
+                '"Descrição em\nduas linhas",2030-01-02,subordinado2\n'
+                'Para o chefe,2030-01-01,chefe\n')
+    response = enviar_arquivo(admin_client, 'solicitacoes', 'lote.csv', conteudo)
+
+    assert response.status_code == 200
+    texto = response.get_data(as_text=True)
+    assert '2 de 4 linhas importadas.' in texto
+    assert '<td>3</td>' in texto and 'Formato de data inválido' in texto
+    assert '<td>6</td>' in texto and "Subordinado &#39;chefe&#39; não encontrado." in texto
+
+
+def test_falha_de_integridade_fica_so_na_linha_culpada(app, banco, importacao, admin_client, monkeypatch):
+    gerar_varios = gsme.servico_hash.gerar_varios
+
+    def outro_admin_importa_antes(senhas):
+        # Simula outra importação gravando 'bia' entre a validação e o INSERT
+        banco.session.add(Usuario(username='bia', password_hash='x', role='subordinado'))
+        banco.session.flush()
+        return gerar_varios(senhas)
+    monkeypatch.setattr(gsme.servico_hash, 'gerar_varios', outro_admin_importa_antes)
+
+    conteudo = json.dumps([{'username': nome, 'password': 'segredo'} for nome in ('ana', 'bia', 'caio')])
+    response = enviar_arquivo(admin_client, 'usuarios', 'lote.json', conteudo)
+
+    texto = response.get_data(as_text=True)
+    assert '2 de 3 linhas importadas.' in texto
+    assert '<td>2</td>' in texto and 'Violação de integridade' in texto
+    with app.app_context():
+        assert nomes(banco) == ['ana', 'bia', 'caio', 'chefe', 'subordinado1', 'subordinado2']
+        bia = banco.session.execute(banco.select(Usuario).filter_by(username='bia')).scalar_one()
+        assert bia.password_hash == 'x'
+
+
+def test_resumo_contado_na_importacao(app, banco, importacao, admin_client):
+    admin_client.post('/admin/importar', json={'tipo': 'solicitacoes', 'linhas': [
+        {'descricao': 'Relatório', 'prazo': '2030-01-01', 'assigned_to_username': 'subordinado1'},
+        {'descricao': 'Relatório', 'prazo': '2030-01-01', 'assigned_to_username': 'subordinado1'},
+        {'descricao': 'Planilha', 'prazo': '2030-01-02', 'assigned_to_username': 'subordinado1'},
+        {'descricao': 'Ofício', 'prazo': '2030-01-01', 'assigned_to_username': 'subordinado2'},
+        {'descricao': 'Inválida', 'prazo': '01/01/2030', 'assigned_to_username': 'subordinado2'},
+    ]})
+
+    def contagens():
+        return sorted((r.assigned_to_username, r.prazo.isoformat(), r.pendentes)
+                      for r in banco.session.execute(banco.select(ResumoSolicitacao)).scalars())
+
+    with app.app_context():
+        assert banco.session.query(Solicitacao).count() == 4
+        incremental = contagens()
+        reconstruir_resumo()
+        assert incremental == contagens() == [
+            ('subordinado1', '2030-01-01', 2),
+            ('subordinado1', '2030-01-02', 1),
+            ('subordinado2', '2030-01-01', 1),
+        ]
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+
+def test_metrics_exige_autenticacao(client):
+    assert client.get('/metrics').status_code == 401
+
+
+def test_metrics_com_token(app, client):
+    app.config['METRICAS_TOKEN'] = 'segredo'
+    assert client.get('/metrics', headers={'Authorization': 'Bearer errado'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer segredo'})
+    assert response.status_code == 200
+    assert 'gsme_request_duration_seconds' in response.get_data(as_text=True)
+
+
+def test_metrics_para_administrador(admin_client):
+    assert admin_client.get('/metrics').status_code == 200
+
+
+def test_consulta_com_erro_nao_acumula_inicios(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.exec_driver_sql('SELECT * FROM tabela_inexistente')
+            assert conn.info.get('metricas_inicio') == []
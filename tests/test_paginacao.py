@@ -0,0 +1,81 @@
+import re
+from datetime import date
+from html import unescape
+
+import pytest
+
+from app import Solicitacao
+
+
+@pytest.fixture
+def solicitacoes(app, banco):
+    app.config.update(MINIATURAS_ATIVAS=False, ITENS_POR_PAGINA=2, ITENS_POR_PAGINA_MAX=3)
+    with app.app_context():
+        # Vários prazos iguais: o cursor precisa desempatar pelo id
+        banco.session.add_all(
+            [Solicitacao(descricao=f'Tarefa {n}', prazo=date(2030, 1, 1), assigned_to_username='subordinado1')
+             for n in range(1, 6)]
+            + [Solicitacao(descricao=f'Outra {n}', prazo=date(2030, 1, 1), assigned_to_username='subordinado2')
+               for n in range(1, 3)]
+            + [Solicitacao(descricao='Tarefa 6', prazo=date(2029, 12, 31), assigned_to_username='subordinado1')]
+        )
+        banco.session.commit()
+
+
+def abrir(client, url, **params):
+    response = client.get(url, query_string=params or None)
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    descricoes = re.findall(r'<td>((?:Tarefa|Outra) \d)</td>', html)
+    links = {rotulo: unescape(href) for href, rotulo in
+             re.findall(r'<a href="([^"]+)" class="button">(?:&laquo; )?(Anteriores|Próximas)', html)}
+    return descricoes, links
+
+
+def percorrer(client, url, **params):
+    """Avança pelas páginas com 'Próximas' e depois volta com 'Anteriores'."""
+    ida = []
+    descricoes, links = abrir(client, url, **params)
+    ida.append(descricoes)
+    while 'Próximas' in links:
+        descricoes, links = abrir(client, links['Próximas'])
+        ida.append(descricoes)
+    volta = [descricoes]
+    while 'Anteriores' in links:
+        descricoes, links = abrir(client, links['Anteriores'])
+        volta.append(descricoes)
+    return ida, volta[::-1]
+
+
+def test_subordinado_percorre_prazos_repetidos(logged_client, solicitacoes):
+    ida, volta = percorrer(logged_client, '/subordinate/dashboard')
+    assert ida == volta == [['Tarefa 6', 'Tarefa 1'], ['Tarefa 2', 'Tarefa 3'], ['Tarefa 4', 'Tarefa 5']]
+
+
+def test_admin_filtrado_mantem_o_filtro_nos_links(admin_client, solicitacoes):
+    ida, volta = percorrer(admin_client, '/admin/dashboard', subordinate='subordinado2', por_pagina=1)
+    assert ida == volta == [['Outra 1'], ['Outra 2']]
+
+
+def test_admin_sem_filtro_ve_todas(admin_client, solicitacoes):
+    ida, _ = percorrer(admin_client, '/admin/dashboard', por_pagina=3)
+    assert sum(ida, []) == ['Tarefa 6', 'Tarefa 1', 'Tarefa 2', 'Tarefa 3', 'Tarefa 4', 'Tarefa 5',
+                            'Outra 1', 'Outra 2']
+
+
+def test_primeira_pagina_nao_tem_anteriores(admin_client, solicitacoes):
+    _, links = abrir(admin_client, '/admin/dashboard')
+    assert 'Anteriores' not in links
+    assert 'Próximas' in links
+
+
+@pytest.mark.parametrize('por_pagina, esperado', [
+    ('1000', 3),  # limitado a ITENS_POR_PAGINA_MAX
+    ('-5', 1),
+    ('0', 2),     # ITENS_POR_PAGINA
+    ('abc', 2),
+])
+def test_por_pagina_limitado(logged_client, solicitacoes, por_pagina, esperado):
+    descricoes, links = abrir(logged_client, '/subordinate/dashboard', por_pagina=por_pagina)
+    assert len(descricoes) == esperado
+    assert f'por_pagina={esperado}' in links['Próximas']
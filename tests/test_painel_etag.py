@@ -0,0 +1,89 @@
+import io
+from datetime import date, timedelta
+
+import pytest
+
+import app as gsme
+from app import Solicitacao
+
+
+@pytest.fixture
+def solicitacao(app, banco):
+    app.config['MINIATURAS_ATIVAS'] = False
+    with app.app_context():
+        nova = Solicitacao(descricao='Relatório', prazo=date(2030, 1, 1), assigned_to_username='subordinado1')
+        banco.session.add(nova)
+        banco.session.commit()
+        return nova.id
+
+
+def entrar(client, username, role):
+    with client.session_transaction() as sess:
+        sess.update(logged_in=True, username=username, role=role)
+
+
+def etag_atual(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag, fraco = response.get_etag()
+    assert etag and fraco
+    return etag
+
+
+def revalidar(client, url, etag):
+    return client.get(url, headers={'If-None-Match': f'W/"{etag}"'})
+
+
+@pytest.mark.parametrize('url, username, role', [
+    ('/admin/dashboard', 'admin', 'admin'),
+    ('/subordinate/dashboard', 'subordinado1', 'subordinado'),
+])
+def test_mesma_versao_responde_304(client, solicitacao, url, username, role):
+    entrar(client, username, role)
+    etag = etag_atual(client, url)
+    response = revalidar(client, url, etag)
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_upload_muda_o_etag(client, solicitacao):
+    entrar(client, 'subordinado1', 'subordinado')
+    etag = etag_atual(client, '/subordinate/dashboard')
+    client.post(f'/upload_arquivo/{solicitacao}', data={'arquivo': (io.BytesIO(b'relatorio'), 'relatorio.pdf')})
+    client.get('/subordinate/dashboard')  # consome a mensagem flash do envio
+
+    assert revalidar(client, '/subordinate/dashboard', etag).status_code == 200
+
+
+def test_exclusao_muda_o_etag(client, solicitacao):
+    entrar(client, 'admin', 'admin')
+    etag = etag_atual(client, '/admin/dashboard')
+    client.get(f'/deletar_solicitacao/{solicitacao}')
+    client.get('/admin/dashboard')  # consome a mensagem flash da exclusão
+
+    assert revalidar(client, '/admin/dashboard', etag).status_code == 200
+
+
+def test_virada_do_dia_muda_o_etag(client, solicitacao, monkeypatch):
+    entrar(client, 'admin', 'admin')
+    etag = etag_atual(client, '/admin/dashboard')
+
+    class Amanha(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+    monkeypatch.setattr(gsme, 'date', Amanha)
+
+    assert revalidar(client, '/admin/dashboard', etag).status_code == 200
+
+
+def test_mensagem_flash_pendente_desativa_o_etag(client, solicitacao):
+    entrar(client, 'admin', 'admin')
+    etag = etag_atual(client, '/admin/dashboard')
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('success', 'Nova solicitacao de serviço adicionada com sucesso.')]
+
+    response = revalidar(client, '/admin/dashboard', etag)
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert 'Nova solicitacao' in response.get_data(as_text=True)
@@ -0,0 +1,35 @@
+import io
+
+import pytest
+
+from app import ResumoSolicitacao, Solicitacao, reconstruir_resumo
+
+
+@pytest.fixture
+def resumo(app, banco):
+    app.config.update(RESUMO_INCREMENTAL=True, MINIATURAS_ATIVAS=False)
+
+
+def contagens(banco):
+    return [(r.assigned_to_username, r.prazo.isoformat(), r.pendentes, r.entregues_a_tempo, r.entregues_com_atraso)
+            for r in banco.session.execute(banco.select(ResumoSolicitacao)).scalars()]
+
+
+def test_resumo_incremental_igual_ao_reconstruido(app, banco, resumo, client):
+    with client.session_transaction() as sess:
+        sess.update(logged_in=True, username='admin', role='admin')
+    for _ in range(2):
+        client.post('/adicionar_solicitacao', data={
+            'descricao': 'Relatório', 'prazo': '2030-01-01', 'assigned_to_username': 'subordinado1',
+        })
+
+    with client.session_transaction() as sess:
+        sess.update(username='subordinado1', role='subordinado')
+    with app.app_context():
+        id = banco.session.execute(banco.select(Solicitacao.id).limit(1)).scalar()
+    client.post(f'/upload_arquivo/{id}', data={'arquivo': (io.BytesIO(b'conteudo'), 'relatorio.pdf')})
+
+    with app.app_context():
+        incremental = contagens(banco)
+        reconstruir_resumo()
+        assert incremental == contagens(banco) == [('subordinado1', '2030-01-01', 1, 1, 0)]
@@ -0,0 +1,44 @@
+import gzip
+import re
+
+from flask import url_for
+
+
+def url_estatica(app, filename):
+    with app.test_request_context():
+        return url_for('static', filename=filename)
+
+
+def test_url_com_hash_do_conteudo(app):
+    assert re.fullmatch(r'/static/style\.[0-9a-f]{12}\.css', url_estatica(app, 'style.css'))
+    assert re.fullmatch(r'/static/img/1\.[0-9a-f]{12}\.png', url_estatica(app, 'img/1.png'))
+
+
+def test_versionado_com_cache_imutavel(app, client):
+    response = client.get(url_estatica(app, 'style.css'))
+    assert response.status_code == 200
+    assert response.content_encoding is None
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == app.config['STATIC_CACHE_MAX_AGE']
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_gzip_negociado(app, client):
+    original = client.get(url_estatica(app, 'style.css')).data
+    response = client.get(url_estatica(app, 'style.css'), headers={'Accept-Encoding': 'gzip'})
+    assert response.content_encoding == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.data) == original
+
+
+def test_imagem_nao_comprimida(app, client):
+    response = client.get(url_estatica(app, 'img/1.png'), headers={'Accept-Encoding': 'gzip, br'})
+    assert response.status_code == 200
+    assert response.content_encoding is None
+    assert response.cache_control.immutable
+
+
+def test_nome_sem_hash_continua_funcionando(client):
+    response = client.get('/static/style.css')
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import os
+from datetime import date
+
+import pytest
+
+import storage
+from app import Arquivo, Solicitacao, Tarefa, liberar_referencia, registrar_referencia
+
+
+def blob(pasta, conteudo):
+    return os.path.join(pasta, hashlib.sha256(conteudo).hexdigest() + '.pdf')
+
+
+@pytest.fixture
+def pasta(app, banco):
+    app.config['MINIATURAS_ATIVAS'] = False
+    return app.config['UPLOAD_FOLDER']
+
+
+@pytest.fixture
+def solicitacoes(app, banco):
+    with app.app_context():
+        novas = [Solicitacao(descricao='Relatório', prazo=date(2030, 1, 1), assigned_to_username='subordinado1')
+                 for _ in range(2)]
+        banco.session.add_all(novas)
+        banco.session.commit()
+        return [s.id for s in novas]
+
+
+def enviar(client, id, conteudo):
+    return client.post(f'/upload_arquivo/{id}', data={'arquivo': (io.BytesIO(conteudo), 'relatorio.pdf')})
+
+
+def referencias(banco, caminho):
+    arquivo = banco.session.get(Arquivo, caminho)
+    return arquivo.referencias if arquivo else 0
+
+
+def test_upload_grava_blob_sem_temporarios(app, pasta, banco, solicitacoes, logged_client):
+    response = enviar(logged_client, solicitacoes[0], b'relatorio')
+    assert response.status_code == 302
+
+    caminho = blob(pasta, b'relatorio')
+    with open(caminho, 'rb') as f:
+        assert f.read() == b'relatorio'
+    assert os.listdir(os.path.join(pasta, storage.PASTA_TEMPORARIA)) == []
+    with app.app_context():
+        solicitacao = banco.session.get(Solicitacao, solicitacoes[0])
+        assert (solicitacao.arquivo_path, solicitacao.status) == (caminho, 'Entregue')
+        assert referencias(banco, caminho) == 1
+
+
+def test_mesmo_conteudo_compartilha_o_blob(app, pasta, banco, solicitacoes, logged_client):
+    for id in solicitacoes:
+        enviar(logged_client, id, b'relatorio')
+    # Reenviar o mesmo arquivo para a mesma solicitacao não conta outra referência
+    enviar(logged_client, solicitacoes[0], b'relatorio')
+
+    with app.app_context():
+        assert referencias(banco, blob(pasta, b'relatorio')) == 2
+        assert banco.session.query(Tarefa).count() == 0
+
+
+def test_reenvio_libera_o_anexo_anterior(app, pasta, banco, solicitacoes, logged_client):
+    enviar(logged_client, solicitacoes[0], b'primeira versao')
+    enviar(logged_client, solicitacoes[0], b'segunda versao')
+
+    with app.app_context():
+        assert referencias(banco, blob(pasta, b'primeira versao')) == 0
+        assert referencias(banco, blob(pasta, b'segunda versao')) == 1
+        tarefa = banco.session.execute(banco.select(Tarefa)).scalar_one()
+        assert tarefa.tipo == 'remover_arquivo'
+        assert blob(pasta, b'primeira versao') in tarefa.argumentos
+
+
+def test_limite_conferido_durante_a_leitura(app, pasta, banco, solicitacoes, logged_client):
+    app.config['UPLOAD_MAX_BYTES'] = 100
+    response = enviar(logged_client, solicitacoes[0], b'x' * 1000)
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/subordinate/dashboard')
+    assert os.listdir(os.path.join(pasta, storage.PASTA_TEMPORARIA)) == []
+    assert not os.path.exists(blob(pasta, b'x' * 1000))
+    with app.app_context():
+        assert banco.session.get(Solicitacao, solicitacoes[0]).arquivo_path is None
+
+
+def test_contagem_de_referencias_no_banco(app, pasta, banco):
+    caminho = blob(pasta, b'relatorio')
+    with app.app_context():
+        # Dois envios do mesmo arquivo novo na mesma transação não disputam o INSERT
+        registrar_referencia('a' * 64, caminho, 9)
+        registrar_referencia('a' * 64, caminho, 9)
+        banco.session.commit()
+        assert referencias(banco, caminho) == 2
+
+        assert liberar_referencia(caminho) is False
+        assert liberar_referencia(caminho) is True
+        banco.session.commit()
+        assert referencias(banco, caminho) == 0
+        # Arquivo antigo, sem registro na tabela 'arquivos'
+        assert liberar_referencia(os.path.join(pasta, 'antigo.pdf')) is True
@@ -0,0 +1,109 @@
+import hashlib
+import os
+
+import pytest
+
+CONTEUDO = b'%PDF-1.4 ' + bytes(range(256)) * 8
+SHA256 = hashlib.sha256(CONTEUDO).hexdigest()
+BLOB = f'{SHA256}.pdf'
+
+
+@pytest.fixture
+def blob(app):
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], BLOB), 'wb') as f:
+        f.write(CONTEUDO)
+    return BLOB
+
+
+@pytest.fixture
+def arquivo_antigo(app):
+    nome = '1_20250805194542_certificado.pdf'
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], nome), 'wb') as f:
+        f.write(CONTEUDO)
+    return nome
+
+
+def test_exige_login(client, blob):
+    response = client.get(f'/uploads/{blob}')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_etag_forte_e_cache_privado(logged_client, blob):
+    response = logged_client.get(f'/uploads/{blob}')
+    assert response.status_code == 200
+    assert response.data == CONTEUDO
+    assert response.headers['ETag'] == f'"{SHA256}"'
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert 'Last-Modified' in response.headers
+    assert response.headers['Content-Disposition'].startswith('attachment')
+    assert response.cache_control.private
+    assert not response.cache_control.public
+    assert response.cache_control.immutable
+
+
+def test_if_none_match_retorna_304(logged_client, blob):
+    response = logged_client.get(f'/uploads/{blob}', headers={'If-None-Match': f'"{SHA256}"'})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == f'"{SHA256}"'
+
+
+def test_if_modified_since_retorna_304(logged_client, blob):
+    last_modified = logged_client.get(f'/uploads/{blob}').headers['Last-Modified']
+    response = logged_client.get(f'/uploads/{blob}', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+
+def test_range_retorna_206(logged_client, blob):
+    response = logged_client.get(f'/uploads/{blob}', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == CONTEUDO[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(CONTEUDO)}'
+    assert response.headers['Content-Length'] == '10'
+
+
+def test_if_range_desatualizado_retorna_arquivo_completo(logged_client, blob):
+    response = logged_client.get(f'/uploads/{blob}', headers={'Range': 'bytes=10-19', 'If-Range': '"outro"'})
+    assert response.status_code == 200
+    assert response.data == CONTEUDO
+
+
+def test_range_invalido_retorna_416(logged_client, blob):
+    response = logged_client.get(f'/uploads/{blob}', headers={'Range': f'bytes={len(CONTEUDO) + 10}-'})
+    assert response.status_code == 416
+
+
+def test_arquivo_antigo_revalida_sempre(logged_client, arquivo_antigo):
+    response = logged_client.get(f'/uploads/{arquivo_antigo}')
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    etag = response.headers['ETag']
+    response = logged_client.get(f'/uploads/{arquivo_antigo}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_x_accel_redirect(app, logged_client, blob):
+    app.config['UPLOAD_ACCEL_REDIRECT'] = '/protected-uploads/'
+    response = logged_client.get(f'/uploads/{blob}')
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'] == f'/protected-uploads/{blob}'
+    assert response.headers['Content-Type'] == 'application/pdf'
+    assert response.data == b''
+
+    response = logged_client.get(f'/uploads/{blob}', headers={'If-None-Match': f'"{SHA256}"'})
+    assert response.status_code == 304
+
+
+def test_x_accel_redirect_arquivo_inexistente(app, logged_client):
+    app.config['UPLOAD_ACCEL_REDIRECT'] = '/protected-uploads/'
+    assert logged_client.get(f'/uploads/{"0" * 64}.pdf').status_code == 404
+    assert logged_client.get('/uploads/..%2Fapp.py').status_code == 404
+
+
+def test_x_sendfile(app, logged_client, blob):
+    app.config['USE_X_SENDFILE'] = True
+    response = logged_client.get(f'/uploads/{blob}')
+    assert response.status_code == 200
+    assert response.headers['X-Sendfile'].endswith(blob)
+    assert response.headers['ETag'] == f'"{SHA256}"'